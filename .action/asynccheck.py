@@ -0,0 +1,419 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" An asyncio solution checker. solution_check_async() has the same
+    command line, output, and exit status as solution_check_simple() but
+    runs header parsing, clang-format, clang-tidy, and the compiler
+    concurrently in one process with asyncio.create_subprocess_exec().
+    At most max_concurrency tools run at once. A fatal failure cancels the
+    checks still running: a submission without any header stops everything
+    and a failed build stops formatting and linting, whose results no
+    longer matter.
+
+    Select it in solution_check.py with GRADER_ASYNC=1.
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import os.path
+import sys
+import time
+from jobgraph import default_workers
+from logger import setup_logger
+from mkcompiledb import compile_commands_entries, write_compile_commands_db
+from srcutilities import (
+    CANCELLED,
+    FORMAT_OPTIONS,
+    build_cache_key,
+    build_command,
+    check_headers_timed,
+    files_changed_from_base,
+    format_cache_key,
+    format_verdict,
+    glob_all_src_files,
+    has_main_function,
+    identify,
+    lint_cache_key,
+    prefetch_compilecmds,
+    report_solution,
+    store_lint_warnings,
+    tidy_command,
+)
+from timing import span
+from workdir import job_dir
+import buildcache
+import cmdexec
+import results
+import resultcache
+
+
+async def _exec(argv, semaphore, timeout=None):
+    """Run argv once the semaphore lets it and return a
+    cmdexec.CommandResult. The tool is killed if the caller is
+    cancelled."""
+    argv = [str(arg) for arg in argv]
+    async with semaphore:
+        start = time.perf_counter()
+        path = cmdexec.executable(argv[0])
+        if not path:
+            result = cmdexec.CommandResult(
+                argv, None, b'', b'No such program', 0.0, False
+            )
+            cmdexec.count(result)
+            return result
+        with span('exec ' + os.path.basename(argv[0])):
+            proc = await asyncio.create_subprocess_exec(
+                path,
+                *argv[1:],
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            timed_out = False
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(), timeout
+                )
+            except asyncio.TimeoutError:
+                proc.kill()
+                stdout, stderr = await proc.communicate()
+                timed_out = True
+                logging.error(
+                    '%s did not finish within %s seconds.', argv[0], timeout
+                )
+            except asyncio.CancelledError:
+                proc.kill()
+                # Reap the child even though this task is being cancelled.
+                await asyncio.shield(proc.wait())
+                raise
+    result = cmdexec.CommandResult(
+        argv,
+        proc.returncode,
+        stdout,
+        stderr,
+        time.perf_counter() - start,
+        timed_out,
+    )
+    cmdexec.count(result)
+    return result
+
+
+async def _format_is_clean(file, semaphore):
+    """The asyncio counterpart of srcutilities.format_is_clean()."""
+    try:
+        key = format_cache_key(file)
+    except FileNotFoundError:
+        logging.error('Cannot check format. No such file. %s', file)
+        return None
+    cached_diff = resultcache.lookup(key)
+    if cached_diff is not None:
+        return len(cached_diff) == 0
+    result = await _exec(
+        ['clang-format'] + FORMAT_OPTIONS + [file], semaphore, 10
+    )
+    if result.returncode is None:
+        logging.error('Cannot run clang-format: %s', result.stderr)
+        return None
+    with open(file, 'rb') as file_handle:
+        differs = file_handle.read() != result.stdout_bytes
+    return format_verdict(file, differs, result.timed_out, result.returncode)
+
+
+async def _lint(
+    files, tidy_options, skip_compile_cmd, semaphore, durations, work_dir
+):
+    """Lint every file with its own clang-tidy, sharing one compile
+    commands DB in work_dir. Returns an ordered dictionary of file to
+    warnings (see srcutilities.lint_check())."""
+    loop = asyncio.get_running_loop()
+    compilecmds = {}
+    if not skip_compile_cmd:
+        compilecmds = await loop.run_in_executor(
+            None,
+            prefetch_compilecmds,
+            [os.path.dirname(os.path.realpath(file)) for file in files],
+        )
+    warnings = collections.OrderedDict()
+    keys = {}
+    for file in files:
+        compilecmd = compilecmds.get(os.path.dirname(os.path.realpath(file)))
+        keys[file] = lint_cache_key(
+            file, tidy_options, skip_compile_cmd, compilecmd
+        )
+        warnings[file] = resultcache.lookup(keys[file])
+        durations['lint:' + file] = 0.0
+    todo = [file for file in files if warnings[file] is None]
+    if todo and not skip_compile_cmd:
+        compile_commands_db = []
+        for file in todo:
+            compilecmd = compilecmds[os.path.dirname(os.path.realpath(file))]
+            compile_commands_db += compile_commands_entries(
+                [os.path.realpath(file)], compilecmd
+            )
+        write_compile_commands_db(
+            compile_commands_db,
+            out=os.path.join(work_dir, 'compile_commands.json'),
+        )
+
+    async def lint_one(file):
+        cmd = tidy_command([file], tidy_options, skip_compile_cmd, work_dir)
+        result = await _exec(cmd, semaphore, 60)
+        lines = [line for line in result.stdout.split('\n') if line != '']
+        store_lint_warnings(keys[file], lines, result.returncode)
+        durations['lint:' + file] = result.duration
+        return lines
+
+    for file, lines in zip(
+        todo, await asyncio.gather(*(lint_one(file) for file in todo))
+    ):
+        warnings[file] = lines
+    return warnings
+
+
+async def _build(file, semaphore, target, timeout=10):
+    """The asyncio counterpart of srcutilities.build(). Returns whether
+    the build succeeded and the compiler's stdout and stderr."""
+    if os.path.exists(target):
+        os.unlink(target)
+    key = build_cache_key(file)
+    messages = buildcache.fetch(key, file, target)
+    if messages is not None:
+        logging.debug('Reusing cached build of %s', file)
+        return True, messages
+    result = await _exec(build_command(file, target), semaphore, timeout)
+    if result.returncode == 0:
+        buildcache.store(key, file, target, result.stdout, result.stderr)
+    return result.returncode == 0, (result.stdout, result.stderr)
+
+
+async def _timed(name, awaitable, durations):
+    """Await awaitable and record how long it took as name."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        durations.setdefault(name, time.perf_counter() - start)
+
+
+async def _check(
+    files,
+    main_src_file,
+    do_format_check,
+    do_lint_check,
+    tidy_options,
+    skip_compile_cmd,
+    max_concurrency,
+    work_dir,
+    binary,
+):
+    """Run every check concurrently, linting in work_dir and building
+    binary.
+    Returns the headers, a dictionary of file to the seconds its header
+    took, and a dictionary of check name to value and duration, or None
+    for the checks if no file has a header."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+    durations = {}
+    tasks = collections.OrderedDict()
+    if do_format_check:
+        for file in files:
+            tasks['format:' + file] = asyncio.ensure_future(
+                _timed(
+                    'format:' + file,
+                    _format_is_clean(file, semaphore),
+                    durations,
+                )
+            )
+    if do_lint_check:
+        tasks['lint'] = asyncio.ensure_future(
+            _lint(
+                files,
+                tidy_options,
+                skip_compile_cmd,
+                semaphore,
+                durations,
+                work_dir,
+            )
+        )
+    if main_src_file:
+        tasks['build'] = asyncio.ensure_future(
+            _timed(
+                'build',
+                _build(main_src_file, semaphore, binary),
+                durations,
+            )
+        )
+
+    def cancel_others(finished):
+        for task in tasks.values():
+            if task is not finished:
+                task.cancel()
+
+    def on_build(task):
+        if not task.cancelled() and not task.exception():
+            if not task.result()[0]:
+                cancel_others(task)
+
+    if 'build' in tasks:
+        tasks['build'].add_done_callback(on_build)
+    headers, header_durations = await loop.run_in_executor(
+        None, check_headers_timed, files
+    )
+    if not any(good for good, _ in headers.values()):
+        cancel_others(None)
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return headers, header_durations, None
+    values = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    outcomes = {}
+    for name, value in zip(tasks, values):
+        if isinstance(value, asyncio.CancelledError):
+            value = CANCELLED
+        elif isinstance(value, Exception):
+            logging.error('Internal error: %s: %s', type(value).__name__, value)
+            value = None
+        if name == 'lint':
+            for file in files:
+                outcomes['lint:' + file] = (
+                    value
+                    if value is None or value is CANCELLED
+                    else value[file],
+                    durations.get('lint:' + file),
+                )
+        else:
+            outcomes[name] = (value, durations.get(name))
+    return headers, header_durations, outcomes
+
+
+def solution_check_async(
+    run=None,
+    files=None,
+    do_format_check=True,
+    do_lint_check=True,
+    tidy_options=None,
+    skip_compile_cmd=False,
+    max_concurrency=None,
+):
+    """Main function for checking student's solution; see
+    srcutilities.solution_check_simple(). At most max_concurrency tools
+    (one per CPU by default) run at once."""
+    logger = setup_logger()
+    run_start = time.perf_counter()
+    if len(sys.argv) < 3:
+        logger.error(
+            'provide target directory, program name, and optionally a base directory to run a diff'
+        )
+        sys.exit(1)
+    target_directory = sys.argv[1]
+    base_directory = sys.argv[3] if len(sys.argv) == 4 else None
+    if not files:
+        files = glob_all_src_files(target_directory)
+    else:
+        files = [os.path.join(sys.argv[1], file) for file in files]
+    if len(files) == 0:
+        logger.error("❌ No files in %s.", target_directory)
+        sys.exit(1)
+
+    # Check if files have changed
+    if base_directory:
+        if not files_changed_from_base(files, base_directory):
+            sys.exit(1)
+    else:
+        logger.debug('Skipping base file comparison.')
+
+    main_src_files = [file for file in files if has_main_function(file)]
+    main_src_file = main_src_files[0] if main_src_files else None
+    with job_dir() as work_dir:
+        binary = os.path.join(work_dir, os.path.basename(sys.argv[2]))
+        headers, header_durations, outcomes = asyncio.run(
+            _check(
+                files,
+                main_src_file,
+                do_format_check,
+                do_lint_check,
+                tidy_options,
+                skip_compile_cmd,
+                max_concurrency or default_workers(),
+                work_dir,
+                binary,
+            )
+        )
+        for file in files:
+            results.emit(
+                'header',
+                headers[file][0],
+                file,
+                header_durations[file],
+                header=headers[file][1],
+            )
+        files_missing_header = [file for file in files if not headers[file][0]]
+        files_with_header = [file for file in files if headers[file][0]]
+        if outcomes is None:
+            logger.error(
+                '❌ No header provided in any file in %s. Exiting.',
+                target_directory,
+            )
+            logger.error('All files: %s', ' '.join(files))
+            results.emit(
+                'solution', 'fail', duration=time.perf_counter() - run_start
+            )
+            sys.exit(1)
+        header = headers[files_with_header[0]][1]
+        logger.info('Start %s', identify(header))
+        logger.info('All files: %s', ' '.join(files))
+        if len(files_missing_header) != 0:
+            logger.warning(
+                'Files missing headers: %s', ' '.join(files_missing_header)
+            )
+
+        def outcome(name):
+            value, duration = outcomes[name]
+            if name == 'build' and isinstance(value, tuple):
+                # Report the compiler's messages as build() does.
+                value, (stdout, stderr) = value
+                if stdout:
+                    logger.info('stdout: %s', stdout.rstrip("\n\r"))
+                if stderr:
+                    logger.info('stderr: %s', stderr.rstrip("\n\r"))
+            return value, duration
+
+        status = report_solution(
+            files,
+            main_src_files,
+            target_directory,
+            outcome,
+            run,
+            do_format_check,
+            do_lint_check,
+            binary,
+        )
+    logger.info('End %s', identify(header))
+    results.emit(
+        'solution',
+        status == 0,
+        duration=time.perf_counter() - run_start,
+        student=header,
+    )
+    sys.exit(status)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Grade many submissions at once. The manifest lists one job per line,
+    a student repository and a part, optionally followed by the binary's
+    name (default asgt):
+
+    ~/cpsc120/lab-02/alice part-1
+    ~/cpsc120/lab-02/alice part-2
+    # Lines starting with # are ignored.
+
+    Jobs are spread across a process pool, one per CPU by default. Each job
+    runs solution_check.py in a private working directory, so the binary
+    and compile_commands.json of one job never clobber another's. One JSON
+    object per job, with its exit status, its output, and the result
+    records the checkers emitted, is written to the output file in the
+    order of the manifest.
+
+    ex.
+    .action/batch_grade.py -j 8 -o grades.jsonl manifest.txt
+"""
+
+import argparse
+import concurrent.futures
+import io
+import json
+import logging
+import os
+import os.path
+import sys
+import tempfile
+import time
+from logger import setup_logger
+from scriptrunner import run_script
+from srcutilities import prefetch_compilecmds
+
+ACTION_DIR = os.path.dirname(os.path.abspath(__file__))
+SOLUTION_CHECK = os.path.join(ACTION_DIR, 'solution_check.py')
+
+
+def read_manifest(file):
+    """Return the jobs in the manifest as dictionaries with the keys repo,
+    part, and binary."""
+    jobs = []
+    with open(file) as file_handle:
+        for number, line in enumerate(file_handle, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if len(fields) not in (2, 3):
+                raise ValueError(
+                    '{}:{}: expected a repository, a part, and optionally a '
+                    'binary name'.format(file, number)
+                )
+            jobs.append(
+                {
+                    'repo': os.path.abspath(os.path.expanduser(fields[0])),
+                    'part': fields[1],
+                    'binary': fields[2] if len(fields) == 3 else 'asgt',
+                }
+            )
+    return jobs
+
+
+def read_results(file):
+    """Return the result records a job wrote to file."""
+    records = []
+    try:
+        with open(file) as file_handle:
+            for line in file_handle:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def grade(job, script=SOLUTION_CHECK):
+    """Run the solution check for one job in a fresh working directory and
+    return the job's record for the report."""
+    record = dict(job)
+    part_dir = os.path.join(job['repo'], job['part'])
+    start = time.perf_counter()
+    if not os.path.isdir(part_dir):
+        record.update(
+            status=None,
+            duration=0.0,
+            output='No such directory: {}\n'.format(part_dir),
+            results=[],
+        )
+        return record
+    with tempfile.TemporaryDirectory(prefix='grade-') as job_dir:
+        # The checker expects to find the part by name in its cwd.
+        os.symlink(part_dir, os.path.join(job_dir, job['part']))
+        results_file = os.path.join(job_dir, 'results.jsonl')
+        stream = io.StringIO()
+        status = run_script(
+            script,
+            [job['part'], job['binary']],
+            job_dir,
+            stream,
+            {
+                'GRADER_RESULTS': results_file,
+                'GRADER_NO_DAEMON': '1',
+                # The batch is already using every CPU.
+                'GRADER_WORKERS': '1',
+            },
+        )
+        record.update(
+            status=status,
+            duration=round(time.perf_counter() - start, 6),
+            output=stream.getvalue(),
+            results=read_results(results_file),
+        )
+    return record
+
+
+def main():
+    """Main function; grade every job in the manifest."""
+    logger = setup_logger()
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('manifest')
+    parser.add_argument('-o', '--output', help='report file; default stdout')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument(
+        '--script',
+        default=SOLUTION_CHECK,
+        help='the checker to run for each job',
+    )
+    args = parser.parse_args()
+    try:
+        jobs = read_manifest(args.manifest)
+    except (OSError, ValueError) as exception:
+        logger.error('Cannot read the manifest: %s', exception)
+        sys.exit(1)
+    # The report may be going to stdout; keep the log out of it.
+    report_level = logging.INFO if args.output else logging.DEBUG
+    logger.log(report_level, 'Grading %d jobs.', len(jobs))
+    # Forked workers inherit the compile commands found here.
+    prefetch_compilecmds(
+        [os.path.join(job['repo'], job['part']) for job in jobs], args.jobs
+    )
+    out = open(args.output, 'w') if args.output else sys.stdout
+    failed = 0
+    try:
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            for record in executor.map(
+                grade, jobs, [os.path.abspath(args.script)] * len(jobs)
+            ):
+                if record['status'] != 0:
+                    failed += 1
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logger.log(report_level, '%d of %d jobs did not pass.', failed, len(jobs))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
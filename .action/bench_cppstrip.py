@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Compare remove_cpp_comments(), which strips comments in-process, with
+    remove_cpp_comments_clang(), which pipes the file through clang++ -E.
+    Source files of increasing size are generated from the lab's C++
+    files and each implementation is timed over several runs.
+
+    ex.
+    python3 .action/bench_cppstrip.py --repeat 5 part-*/*.cc
+"""
+
+import argparse
+import glob
+import os
+import os.path
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from srcutilities import remove_cpp_comments, remove_cpp_comments_clang
+
+ACTION_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(ACTION_DIR)
+
+
+def time_function(func, file, repeat):
+    """Return the median time in seconds of func(file) over repeat runs."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(file)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    """Main function; time both implementations and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--scale',
+        type=int,
+        nargs='*',
+        default=[1, 10, 100],
+        help='number of copies of the source to concatenate',
+    )
+    parser.add_argument('files', nargs='*')
+    args = parser.parse_args()
+    files = args.files or sorted(
+        glob.glob(os.path.join(ROOT_DIR, 'part-*/*.cc'))
+    )
+    if not files:
+        print('No C++ files to benchmark.')
+        sys.exit(1)
+    use_clang = shutil.which('clang++') is not None
+    if not use_clang:
+        print('clang++ not found; timing the in-process path only.')
+    source = b''.join(open(file, 'rb').read() for file in files)
+    row = '{:>10} {:>14} {:>14} {:>9}'
+    print(row.format('bytes', 'in-process ms', 'clang++ -E ms', 'speedup'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in args.scale:
+            file = os.path.join(tmp_dir, 'bench_{}.cc'.format(scale))
+            with open(file, 'wb') as file_handle:
+                file_handle.write(source * scale)
+            native = time_function(remove_cpp_comments, file, args.repeat)
+            clang = None
+            if use_clang:
+                clang = time_function(
+                    remove_cpp_comments_clang, file, args.repeat
+                )
+            print(
+                row.format(
+                    len(source) * scale,
+                    '{:.2f}'.format(native * 1000),
+                    '{:.2f}'.format(clang * 1000) if clang else '-',
+                    '{:.1f}x'.format(clang / native) if clang else '-',
+                )
+            )
+
+
+if __name__ == '__main__':
+    main()
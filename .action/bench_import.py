@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Measure how long each C++ entry point takes to import its modules,
+    with black loaded lazily (the current behavior) and with black imported
+    eagerly up front (the previous behavior). Each measurement is taken in
+    a fresh interpreter and the median of several runs is reported.
+
+    ex.
+    python3 .action/bench_import.py --repeat 20
+"""
+
+import argparse
+import os
+import os.path
+import statistics
+import subprocess
+import sys
+
+ACTION_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(ACTION_DIR)
+PYTHON_DIR = os.path.join(ROOT_DIR, '.python/lib/python3.8/site-packages')
+VENDORED_PATHS = [
+    PYTHON_DIR,
+    os.path.join(PYTHON_DIR, 'black-22.6.0-py3.8.egg'),
+    os.path.join(PYTHON_DIR, 'pathspec-0.9.0-py3.8.egg'),
+    os.path.join(PYTHON_DIR, 'click-8.1.3-py3.8.egg'),
+]
+
+ENTRY_POINTS = [
+    'part-1/check_formatting',
+    'part-2/check_for_lint',
+    'part-3/check_lint_and_format',
+    '.action/format_check.py',
+    '.action/lint_check.py',
+    '.action/simple_build_check.py',
+]
+
+# Run the entry point's module level code (its imports) but not main().
+CHILD = '''
+import runpy
+import sys
+import time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+{preload}
+runpy.run_path({script!r}, run_name='bench_import')
+print(time.perf_counter() - start, 'black' in sys.modules)
+'''
+
+
+def time_import(script, eager, repeat):
+    """Return the median import time in seconds of script over repeat
+    fresh interpreters and whether black ended up loaded."""
+    code = CHILD.format(
+        paths=[ACTION_DIR] + VENDORED_PATHS,
+        preload='import black' if eager else '',
+        script=os.path.join(ROOT_DIR, script),
+    )
+    samples = []
+    loaded = False
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=ROOT_DIR,
+        )
+        elapsed, loaded = proc.stdout.split()
+        samples.append(float(elapsed))
+    return (statistics.median(samples), loaded == 'True')
+
+
+def main():
+    """Main function; time every entry point and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('entry_points', nargs='*', default=ENTRY_POINTS)
+    args = parser.parse_args()
+    row = '{:<32} {:>10} {:>8} {:>12} {:>10}'
+    print(
+        row.format('Entry point', 'lazy (ms)', 'black?', 'eager (ms)', 'saved')
+    )
+    for script in args.entry_points:
+        lazy, lazy_loaded = time_import(script, False, args.repeat)
+        eager, _ = time_import(script, True, args.repeat)
+        print(
+            row.format(
+                script,
+                '{:.1f}'.format(lazy * 1000),
+                'yes' if lazy_loaded else 'no',
+                '{:.1f}'.format(eager * 1000),
+                '{:.0%}'.format(1 - lazy / eager) if eager else '-',
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Benchmark the grading pipeline. Synthetic C++ and Python submissions
+    of several sizes, with good, partial, and missing headers, are
+    generated in a temporary directory and dict_header(),
+    remove_cpp_comments(), strip_and_compare_files(), format_check(),
+    lint_check(), pyformat_check(), and a full solution_check_simple() are
+    timed on them. The median of several runs is printed next to the
+    previous run's median and the run is appended to a JSON history file
+    so regressions are easy to spot.
+
+    Only the local clang tools are used; a benchmark whose tool is not
+    installed is skipped. The result cache is disabled so every run pays
+    the full cost of the tools; pass --use-cache to measure warm runs.
+
+    ex.
+    python3 .action/bench_pipeline.py --repeat 5 --sizes 1 20 200
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import os.path
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ACTION_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(ACTION_DIR)
+
+HEADER_VARIANTS = ('good', 'partial', 'missing')
+
+CC_HEADER = """// Tuffy Titan
+// CPSC 120-01
+// 2022-09-21
+// tuffy@csu.fullerton.edu
+// @tuffy
+//
+// Lab 02-01
+// Partners: @elephant
+//
+// A synthetic submission for benchmarking.
+//
+"""
+
+PY_HEADER = """# Tuffy Titan
+# CPSC 120-01
+# 2022-09-21
+# tuffy@csu.fullerton.edu
+# @tuffy
+#
+# Lab 02-01
+# Partners: @elephant
+#
+# A synthetic submission for benchmarking.
+#
+"""
+
+CC_FUNCTION = """
+// Compute a running total; the comment and the odd spacing give the
+// comment stripper and clang-format something to do.
+int Total{index}(int count) {{
+  int total = 0;  /* start at zero */
+  for (int i = 0; i < count; i++) {{
+    total   += i * {index};
+  }}
+  return total;
+}}
+"""
+
+CC_MAIN = """
+int main(int argc, char const* argv[]) {{
+  std::cout << "Total " << Total0({size}) << "\\n";
+  return 0;
+}}
+"""
+
+PY_FUNCTION = """
+
+def total_{index}(count):
+    # Compute a running total.
+    total = 0
+    for i in range( count ):
+        total += i * {index}
+    return total
+"""
+
+PY_MAIN = """
+
+if __name__ == '__main__':
+    print(total_0({size}))
+"""
+
+
+def header(template, variant):
+    """Return the header template as a good, partial (no email), or
+    missing header."""
+    if variant == 'missing':
+        return ''
+    if variant == 'partial':
+        return ''.join(
+            line
+            for line in template.splitlines(True)
+            if '@csu.fullerton.edu' not in line
+        )
+    return template
+
+
+def cc_source(size, variant):
+    """A C++ submission with size functions and a main function."""
+    body = ''.join(CC_FUNCTION.format(index=index) for index in range(size))
+    return (
+        header(CC_HEADER, variant)
+        + '\n#include <iostream>\n'
+        + body
+        + CC_MAIN.format(size=size)
+    )
+
+
+def py_source(size, variant):
+    """A Python submission with size functions."""
+    body = ''.join(PY_FUNCTION.format(index=index) for index in range(size))
+    return header(PY_HEADER, variant) + body + PY_MAIN.format(size=size)
+
+
+def write_submission(directory, size, variant):
+    """Write a C++ and a Python submission, and an edited copy of the C++
+    file to diff against, to directory. Returns the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'cc': os.path.join(directory, 'main.cc'),
+        'py': os.path.join(directory, 'main.py'),
+        'base': os.path.join(directory, 'base.cc.txt'),
+    }
+    source = cc_source(size, variant)
+    with open(paths['cc'], 'w') as file_handle:
+        file_handle.write(source)
+    with open(paths['base'], 'w') as file_handle:
+        file_handle.write(source.replace('total   +=', 'total +='))
+    with open(paths['py'], 'w') as file_handle:
+        file_handle.write(py_source(size, variant))
+    return paths
+
+
+def time_call(func, repeat):
+    """Return the times in seconds of repeat calls of func."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            func()
+        except SystemExit:
+            pass
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def available_benchmarks():
+    """Return a list of (name, tool, function of the submission paths)
+    for every benchmark whose tool is installed. The checkers are imported
+    here, after the cache settings are in place."""
+    # pylint: disable=import-outside-toplevel
+    from parse_header import dict_header
+    from srcutilities import (
+        format_check,
+        lint_check,
+        pyformat_check,
+        remove_cpp_comments,
+        solution_check_simple,
+        strip_and_compare_files,
+    )
+
+    def read(path):
+        with open(path) as file_handle:
+            return file_handle.read()
+
+    def solution_check(paths):
+        saved_argv = sys.argv
+        sys.argv = [sys.argv[0], os.path.dirname(paths['cc']), 'asgt']
+        try:
+            solution_check_simple(files=[os.path.basename(paths['cc'])])
+        finally:
+            sys.argv = saved_argv
+
+    try:
+        import black  # pylint: disable=unused-import
+
+        have_black = True
+    except ImportError:
+        have_black = False
+
+    benchmarks = [
+        ('dict_header', None, lambda paths: dict_header(read(paths['cc']))),
+        ('remove_cpp_comments', None, lambda p: remove_cpp_comments(p['cc'])),
+        (
+            'strip_and_compare_files',
+            None,
+            lambda paths: strip_and_compare_files(paths['base'], paths['cc']),
+        ),
+        ('format_check', 'clang-format', lambda p: format_check(p['cc'])),
+        ('lint_check', 'clang-tidy', lambda p: lint_check(p['cc'])),
+        (
+            'pyformat_check',
+            None if have_black else 'black',
+            lambda paths: pyformat_check(paths['py']),
+        ),
+        ('solution_check_simple', 'clang++', solution_check),
+    ]
+    available = []
+    for name, tool, func in benchmarks:
+        if tool and not shutil.which(tool):
+            print('{} not found; skipping {}.'.format(tool, name))
+            continue
+        if name == 'solution_check_simple' and not all(
+            shutil.which(tool) for tool in ('clang-format', 'clang-tidy')
+        ):
+            print('clang tools not found; skipping {}.'.format(name))
+            continue
+        available.append((name, func))
+    return available
+
+
+def git_revision():
+    """The commit being benchmarked, if this is a git checkout."""
+    try:
+        proc = subprocess.run(
+            ['git', '-C', ROOT_DIR, 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            check=False,
+            text=True,
+        )
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def load_history(path):
+    """Return the list of previous runs stored in path."""
+    try:
+        with open(path) as file_handle:
+            return json.load(file_handle)
+    except (OSError, ValueError):
+        return []
+
+
+def previous_medians(history):
+    """Map (benchmark, size, variant) to its median in the most recent run
+    which measured it."""
+    medians = {}
+    for run in history:
+        for row in run['results']:
+            medians[(row['benchmark'], row['size'], row['variant'])] = row[
+                'median'
+            ]
+    return medians
+
+
+def main():
+    """Main function; run the benchmarks and record them."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='*',
+        default=[1, 20, 200],
+        help='number of functions in each generated submission',
+    )
+    parser.add_argument(
+        '--variants',
+        nargs='*',
+        choices=HEADER_VARIANTS,
+        default=list(HEADER_VARIANTS),
+    )
+    parser.add_argument(
+        '--only', nargs='*', help='run only the named benchmarks'
+    )
+    parser.add_argument(
+        '--history',
+        default=os.path.join(os.getcwd(), 'bench_history.json'),
+        help='JSON file the results are appended to',
+    )
+    parser.add_argument('--use-cache', action='store_true')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    if not args.use_cache:
+        os.environ['GRADER_CACHE'] = '0'
+    os.environ['GRADER_NO_DAEMON'] = '1'
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    benchmarks = available_benchmarks()
+    if args.only:
+        benchmarks = [item for item in benchmarks if item[0] in args.only]
+    history = load_history(args.history)
+    previous = previous_medians(history)
+    rows = []
+    row = '{:<24} {:>6} {:<8} {:>11} {:>11} {:>8}'
+    print(
+        row.format(
+            'benchmark', 'size', 'header', 'median ms', 'last ms', 'change'
+        )
+    )
+    saved_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The checkers write compile databases and binaries to the cwd.
+        os.chdir(tmp_dir)
+        try:
+            for size in args.sizes:
+                for variant in args.variants:
+                    paths = write_submission(
+                        os.path.join(tmp_dir, '{}-{}'.format(size, variant)),
+                        size,
+                        variant,
+                    )
+                    for name, func in benchmarks:
+                        samples = time_call(
+                            lambda: func(paths),  # pylint: disable=W0640
+                            args.repeat,
+                        )
+                        median = statistics.median(samples)
+                        last = previous.get((name, size, variant))
+                        rows.append(
+                            {
+                                'benchmark': name,
+                                'size': size,
+                                'variant': variant,
+                                'median': median,
+                                'min': min(samples),
+                                'samples': samples,
+                            }
+                        )
+                        print(
+                            row.format(
+                                name,
+                                size,
+                                variant,
+                                '{:.2f}'.format(median * 1000),
+                                '{:.2f}'.format(last * 1000) if last else '-',
+                                '{:+.0%}'.format(median / last - 1)
+                                if last
+                                else '-',
+                            )
+                        )
+        finally:
+            os.chdir(saved_cwd)
+    history.append(
+        {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'cache': args.use_cache,
+            'results': rows,
+        }
+    )
+    with open(args.history, 'w') as file_handle:
+        json.dump(history, file_handle, indent=1)
+    print('Results appended to {}'.format(args.history))
+
+
+if __name__ == '__main__':
+    main()
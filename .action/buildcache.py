@@ -0,0 +1,165 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" A content-addressed cache of compiled binaries. A build is keyed by
+    the hash of its sources, the compiler flags, and the compiler's
+    version, so a binary built moments earlier by another check of the
+    same unchanged file is copied into place instead of being rebuilt.
+    The compiler's messages are kept with the binary and replayed.
+
+    Binaries live under $GRADER_CACHE_DIR/builds and are limited to
+    $GRADER_BUILD_CACHE_MAX_BYTES bytes (default 256 MiB). """
+
+import glob
+import hashlib
+import os
+import os.path
+import shutil
+import tempfile
+import resultcache
+
+# Stands in for the source file's name in the saved compiler messages.
+_FILE_PLACEHOLDER = '\0file\0'
+
+
+def build_cache_dir():
+    """The directory the binaries are kept in."""
+    return os.path.join(resultcache.default_cache_dir(), 'builds')
+
+
+def build_cache_max_bytes():
+    """The size the binaries are limited to."""
+    return int(
+        os.environ.get('GRADER_BUILD_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    )
+
+
+def sources_digest(files, base_dir=None):
+    """Return one digest covering the names (relative to base_dir, or just
+    the base names) and contents of files."""
+    digest = hashlib.sha256()
+    for file in sorted(files):
+        if base_dir:
+            name = os.path.relpath(file, base_dir)
+        else:
+            name = os.path.basename(file)
+        digest.update(name.encode('utf-8', 'surrogateescape'))
+        digest.update(resultcache.file_digest(file).encode('ascii'))
+    return digest.hexdigest()
+
+
+def build_sources(file):
+    """Return the files whose contents determine the build of file: the
+    file itself and the headers next to it."""
+    directory = os.path.dirname(file) or '.'
+    return [file] + sorted(glob.glob(os.path.join(directory, '*.h')))
+
+
+def build_key(file, compiler, flags):
+    """Return the cache key for compiling file with compiler and flags."""
+    return resultcache.cache_key(
+        file, compiler, flags, sources_digest(build_sources(file))
+    )
+
+
+def _binary_path(key):
+    return os.path.join(build_cache_dir(), key[:2], key + '.bin')
+
+
+def fetch(key, file, target):
+    """Copy the cached binary for key to target. Returns the compiler's
+    (stdout, stderr) from the original build, naming file, or None when
+    there is no cached build."""
+    if not resultcache.cache_enabled():
+        return None
+    messages = resultcache.lookup(key)
+    path = _binary_path(key)
+    if messages is None or not os.path.exists(path):
+        return None
+    try:
+        shutil.copy2(path, target)
+        os.utime(path)
+    except OSError:
+        return None
+    return tuple(
+        message.replace(_FILE_PLACEHOLDER, file) for message in messages
+    )
+
+
+def store(key, file, target, stdout, stderr):
+    """Save the binary target built from file along with the compiler's
+    messages."""
+    if not resultcache.cache_enabled():
+        return
+    path = _binary_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix='.tmp', delete=False
+        ) as file_handle:
+            temporary = file_handle.name
+        shutil.copy2(target, temporary)
+        os.replace(temporary, path)
+    except OSError:
+        return
+    resultcache.store(
+        key,
+        [
+            message.replace(file, _FILE_PLACEHOLDER)
+            for message in (stdout or '', stderr or '')
+        ],
+    )
+    resultcache.evict_if_due(
+        build_cache_dir(), build_cache_max_bytes(), suffix='.bin'
+    )
+
+
+def _stamp_key(target_dir):
+    return hashlib.sha256(
+        ('make-stamp\0' + os.path.realpath(target_dir)).encode(
+            'utf-8', 'surrogateescape'
+        )
+    ).hexdigest()
+
+
+def make_inputs_digest(target_dir, files):
+    """Return a digest of the inputs to a make build in target_dir: the
+    given source files and the Makefile."""
+    makefile = os.path.join(target_dir, 'Makefile')
+    inputs = list(files)
+    if os.path.exists(makefile):
+        inputs.append(makefile)
+    return sources_digest(inputs, target_dir)
+
+
+def make_inputs_unchanged(target_dir, digest):
+    """True if the last successful make build in target_dir had the same
+    inputs."""
+    return resultcache.lookup(_stamp_key(target_dir)) == digest
+
+
+def record_make_inputs(target_dir, digest):
+    """Remember the inputs of a successful make build in target_dir."""
+    resultcache.store(_stamp_key(target_dir), digest)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Check that the diffs built from clang-format's replacements (see
+    formatdiff) are the diffs of clang-format's full output. The lab's
+    C++ files are mangled at random and reformatted both ways; any file
+    whose diffs differ is kept and reported, and the exit status is 1.
+    The seed makes a run repeatable.
+
+    ex.
+    python3 .action/check_formatdiff.py --count 200 --seed 1 part-*/*.cc
+"""
+
+import argparse
+import collections
+import difflib
+import glob
+import os
+import os.path
+import random
+import re
+import shutil
+import sys
+import tempfile
+from srcutilities import _format_lines_full, _format_lines_replacements
+
+ACTION_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(ACTION_DIR)
+
+
+def _reindent(line, rng):
+    return ' ' * rng.randrange(0, 9) + line.lstrip()
+
+
+def _squeeze(line, rng):
+    return re.sub(r'\s*([=,+<>;(){}])\s*', r'\1', line)
+
+
+def _spread(line, rng):
+    return re.sub(r'([=,+<>;(){}])', r' \1 ', line)
+
+
+def _trail(line, rng):
+    return line + ' ' * rng.randrange(1, 4)
+
+
+MANGLERS = (_reindent, _squeeze, _spread, _trail)
+
+
+def mangle(lines, rng, rate):
+    """Return a copy of lines with about rate of them mangled: reindented,
+    squeezed, spread out, given trailing blanks, joined with the next
+    line, or followed by blank lines."""
+    mangled = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if rng.random() >= rate:
+            mangled.append(line)
+            continue
+        choice = rng.randrange(len(MANGLERS) + 2)
+        if choice < len(MANGLERS):
+            mangled.append(MANGLERS[choice](line, rng))
+        elif choice == len(MANGLERS) and index < len(lines):
+            mangled.append(line + ' ' + lines[index].lstrip())
+            index += 1
+        else:
+            mangled.extend([line] + [''] * rng.randrange(1, 3))
+    return mangled
+
+
+def compare(file):
+    """Return True if the diff format_diff() builds from clang-format's
+    replacements for file is the diff of clang-format's full output, or
+    None if the replacements cannot be used."""
+    found = _format_lines_replacements(file, 10)
+    if found is None:
+        return None
+    full = _format_lines_full(file, 10)
+    return list(difflib.context_diff(*found[:2], 'a', 'b', n=3)) == list(
+        difflib.context_diff(*full[:2], 'a', 'b', n=3)
+    )
+
+
+def main():
+    """Main function; mangle, diff both ways, and report mismatches."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--rate', type=float, default=0.2, help='share of lines to mangle'
+    )
+    parser.add_argument('files', nargs='*')
+    args = parser.parse_args()
+    files = args.files or sorted(
+        glob.glob(os.path.join(ROOT_DIR, 'part-*/*.cc'))
+    )
+    if not files:
+        print('No C++ files to mangle.')
+        sys.exit(1)
+    if shutil.which('clang-format') is None:
+        print('clang-format not found.')
+        sys.exit(1)
+    sources = [open(file).read().split('\n') for file in files]
+    rng = random.Random(args.seed)
+    tmp_dir = tempfile.mkdtemp(prefix='formatdiff-')
+    counts = collections.Counter()
+    mismatches = []
+    for number in range(args.count):
+        file = os.path.join(tmp_dir, 'mangled_{}.cc'.format(number))
+        with open(file, 'w') as file_handle:
+            file_handle.write(
+                '\n'.join(mangle(rng.choice(sources), rng, args.rate))
+            )
+        outcome = compare(file)
+        counts[outcome] += 1
+        if outcome is False:
+            mismatches.append(file)
+        else:
+            os.unlink(file)
+    print(
+        '{} identical, {} different, {} without replacements'.format(
+            counts[True], counts[False], counts[None]
+        )
+    )
+    for file in mismatches:
+        print('Diffs differ for {}'.format(file))
+    if not mismatches:
+        shutil.rmtree(tmp_dir)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Run the external tools. Commands are argument lists, never shell
+    strings, so there is no /bin/sh between the checker and the tool and
+    paths with spaces are passed through intact. The program is resolved
+    to a full path once and descriptors are not closed in the child
+    (Python opens them non-inheritable), which lets subprocess launch the
+    tool with posix_spawn() instead of fork() and exec().
+
+    Output is captured as bytes and decoded only when it is asked for.
+    Every command's calls, failures, timeouts, and run time are counted
+    per program; see counters(). """
+
+import collections
+import logging
+import os
+import os.path
+import shutil
+import subprocess
+import threading
+import time
+from timing import span
+
+_executables = {}
+
+Counter = collections.namedtuple(
+    'Counter', ['calls', 'failures', 'timeouts', 'seconds']
+)
+
+_counters = {}
+
+# count() is called from the threads of the thread pools.
+_counters_lock = threading.Lock()
+
+
+class CommandResult:
+    """The outcome of a command. stdout and stderr are decoded text,
+    stdout_bytes and stderr_bytes the raw output. returncode is None if
+    the program could not be started; timed_out is True if it was killed
+    because it ran too long."""
+
+    def __init__(
+        self, argv, returncode, stdout_bytes, stderr_bytes, duration, timed_out
+    ):
+        self.argv = argv
+        self.returncode = returncode
+        self.stdout_bytes = stdout_bytes
+        self.stderr_bytes = stderr_bytes
+        self.duration = duration
+        self.timed_out = timed_out
+        self._stdout = None
+        self._stderr = None
+
+    @property
+    def stdout(self):
+        """The standard output as text."""
+        if self._stdout is None:
+            self._stdout = self.stdout_bytes.decode('utf-8', 'replace')
+        return self._stdout
+
+    @property
+    def stderr(self):
+        """The standard error as text."""
+        if self._stderr is None:
+            self._stderr = self.stderr_bytes.decode('utf-8', 'replace')
+        return self._stderr
+
+    @property
+    def ok(self):
+        """True if the command ran and exited with status zero."""
+        return self.returncode == 0
+
+    def __repr__(self):
+        return 'CommandResult({!r}, returncode={!r})'.format(
+            self.argv, self.returncode
+        )
+
+
+def executable(program):
+    """Return the full path of program, searching $PATH once per program.
+    Programs given with a directory are returned as they are."""
+    if os.path.dirname(program):
+        return program
+    if program not in _executables:
+        _executables[program] = shutil.which(program)
+    return _executables[program]
+
+
+def count(result):
+    """Add a finished command's CommandResult to its program's counter."""
+    program = os.path.basename(result.argv[0])
+    with _counters_lock:
+        counter = _counters.get(program, Counter(0, 0, 0, 0.0))
+        _counters[program] = Counter(
+            counter.calls + 1,
+            counter.failures + (0 if result.ok else 1),
+            counter.timeouts + (1 if result.timed_out else 0),
+            counter.seconds + result.duration,
+        )
+
+
+def counters():
+    """Return a dictionary of program name to its Counter."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def popen(argv, **kwargs):
+    """Start argv as subprocess.Popen does, resolving the program and
+    allowing posix_spawn(). Raises OSError if the program is not found."""
+    argv = [str(arg) for arg in argv]
+    path = executable(argv[0])
+    if not path:
+        raise FileNotFoundError('No such program: {}'.format(argv[0]))
+    kwargs.setdefault('close_fds', False)
+    return subprocess.Popen(argv, executable=path, **kwargs)
+
+
+def run(argv, timeout=None, input_bytes=None, capture=True):
+    """Run the command argv, a list of the program and its arguments, and
+    wait for it to finish or for timeout seconds to pass. input_bytes is
+    written to the command's standard input. Returns a CommandResult."""
+    argv = [str(arg) for arg in argv]
+    program = os.path.basename(argv[0])
+    pipe = subprocess.PIPE if capture else subprocess.DEVNULL
+    start = time.perf_counter()
+    timed_out = False
+    with span('exec ' + program):
+        try:
+            proc = popen(
+                argv,
+                stdin=subprocess.PIPE if input_bytes is not None else None,
+                stdout=pipe,
+                stderr=pipe,
+            )
+        except OSError as exception:
+            logging.debug('Cannot run %s: %s', program, exception)
+            result = CommandResult(
+                argv,
+                None,
+                b'',
+                str(exception).encode('utf-8'),
+                time.perf_counter() - start,
+                False,
+            )
+            count(result)
+            return result
+        with proc:
+            try:
+                stdout, stderr = proc.communicate(input_bytes, timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                stdout, stderr = proc.communicate()
+                timed_out = True
+                logging.error(
+                    '%s did not finish within %s seconds.', program, timeout
+                )
+    result = CommandResult(
+        argv,
+        proc.returncode,
+        stdout or b'',
+        stderr or b'',
+        time.perf_counter() - start,
+        timed_out,
+    )
+    count(result)
+    return result
@@ -0,0 +1,80 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Remove comments from C and C++ source code without running the
+    preprocessor. The source is scanned once, as bytes, by a tokenizer
+    which recognizes the tokens a comment marker can hide inside: string
+    and character literals (with their prefixes), raw strings, and
+    numbers with digit separators. Comments are replaced by a space, as
+    the preprocessor does, and everything else is copied through.
+    Afterwards line continuations are joined, trailing whitespace is
+    removed, and runs of blank lines are collapsed so that two files which
+    differ only in comments and spacing compare equal. """
+
+import re
+
+# Order matters: the first alternative which matches at a position wins.
+# Only numbers with digit separators need to be matched; a separator could
+# otherwise be mistaken for the start of a character literal. The leading
+# lookahead lets the scan skip quickly over everything else.
+_TOKEN_REGEX = re.compile(
+    rb'''
+    (?=[uULR"'/]|[0-9][0-9A-Za-z_.]*')
+    (?:(?P<raw>(?:u8|u|U|L)?R"(?P<delim>[^()\\ \t\n]{0,16})\(.*?\)(?P=delim)")
+    |(?P<string>(?:u8|u|U|L)?"(?:\\(?:\r?\n|.)|[^"\\\n])*"?)
+    |(?P<char>(?:u8|u|U|L)?'(?:\\(?:\r?\n|.)|[^'\\\n])*'?)
+    |(?P<number>[0-9][0-9A-Za-z_.]*(?:'[0-9A-Za-z_.]+)+)
+    |(?P<comment>//(?:\\\r?\n|[^\n])*|/\*.*?(?:\*/|\Z)))
+    ''',
+    re.DOTALL | re.VERBOSE,
+)
+_SPLICE_REGEX = re.compile(rb'\\\r?\n')
+_TRAILING_SPACE_REGEX = re.compile(rb'[ \t\r\f\v]+$', re.MULTILINE)
+_BLANK_LINES_REGEX = re.compile(rb'\n{3,}')
+
+
+def _replace_comment(match):
+    """Replace a comment with a single space and leave any other token as
+    it is."""
+    if match.lastgroup == 'comment':
+        return b' '
+    return match.group(0)
+
+
+def strip_comments(source):
+    """Given C or C++ source code as bytes, return it as bytes with its
+    comments removed."""
+    return _TOKEN_REGEX.sub(_replace_comment, source)
+
+
+def normalize(source):
+    """Given C or C++ source code as bytes, return it as bytes with its
+    comments removed, line continuations joined, trailing whitespace
+    removed, and runs of blank lines collapsed into one."""
+    source = strip_comments(source)
+    source = _SPLICE_REGEX.sub(b'', source)
+    source = _TRAILING_SPACE_REGEX.sub(b'', source)
+    source = _BLANK_LINES_REGEX.sub(b'\n\n', source)
+    return source.strip(b'\n') + b'\n'
@@ -27,11 +27,19 @@
 """ Check the given files to see if they conform to the Google C++
     Programming style using clang-format. """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
 import logging
 import os.path
+import time
 from logger import setup_logger
-from srcutilities import format_check
+import results
+from srcutilities import format_is_clean, format_diff
 
 def main():
     """ Main function; check the format of each file on the
@@ -41,19 +49,40 @@ def main():
         logger.warning('Only %s arguments provided.', len(sys.argv))
         logger.warning('Provide a list of files to check.')
     status = 0
+    run_start = time.perf_counter()
     for in_file in sys.argv[1:]:
         logger.info('Checking format for file: %s', in_file)
         if not os.path.exists(in_file):
             logger.debug('File %s does not exist. Continuing.', in_file)
+            results.emit('format', 'skipped', in_file, reason='missing file')
             continue
-        diff = format_check(in_file)
-        if len(diff) != 0:
-            logger.warning("Error: Formatting needs improvement.")
-            diff_string = 'Contextual Diff\n' + '\n'.join(diff)
-            logger.warning(diff_string)
-            status = 1
-        else:
+        start = time.perf_counter()
+        clean = format_is_clean(in_file)
+        if clean:
+            results.emit(
+                'format',
+                True,
+                in_file,
+                time.perf_counter() - start,
+                diff_lines=0,
+            )
             logger.info('Formatting passed')
+            continue
+        logger.warning("Error: Formatting needs improvement.")
+        diff = list(format_diff(in_file))
+        diff_string = 'Contextual Diff\n' + '\n'.join(diff)
+        logger.warning(diff_string)
+        results.emit(
+            'format',
+            'error' if clean is None else 'fail',
+            in_file,
+            time.perf_counter() - start,
+            diff_lines=len(diff),
+        )
+        status = 1
+    results.emit(
+        'format', status == 0, duration=time.perf_counter() - run_start
+    )
     sys.exit(status)
 
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" A cache of the Python files black found to be formatted. black's own
+    cache keys a file on its modification time and size, which a fresh
+    checkout always changes; this one keys it on the SHA-256 digest of
+    the file's bytes. The modification time and size seen when a
+    formatted file was last hashed are kept too, so an untouched file is
+    looked up without being read.
+
+    The cache is an SQLite database, format.sqlite3, in
+    $GRADER_FORMAT_CACHE_DIR, by default the black directory of the result
+    cache (see resultcache). It is opened in WAL mode so jobs sharing the
+    directory read while another writes; each batch's entries are upserted
+    in one transaction, and a writer waits up to BUSY_TIMEOUT seconds for
+    another to finish. The directory must be on a local file system. At
+    most $GRADER_FORMAT_CACHE_MAX_ENTRIES (default 10000) digests are
+    kept, the most recently used. GRADER_CACHE=0 disables the cache. """
+
+import hashlib
+import logging
+import os
+import os.path
+import sqlite3
+import time
+import resultcache
+
+CACHE_DIR_ENV = 'GRADER_FORMAT_CACHE_DIR'
+
+# Seconds a connection waits for another job's write to finish.
+BUSY_TIMEOUT = 10.0
+
+DB_NAME = 'format.sqlite3'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS formatted (
+    mode TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (mode, digest)
+);
+CREATE INDEX IF NOT EXISTS formatted_last_used ON formatted (last_used);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+'''
+
+
+def cache_dir():
+    """The directory the cache is kept in."""
+    return os.environ.get(CACHE_DIR_ENV) or os.path.join(
+        resultcache.default_cache_dir(), 'black'
+    )
+
+
+def max_entries():
+    """The number of digests the cache is limited to."""
+    return int(os.environ.get('GRADER_FORMAT_CACHE_MAX_ENTRIES', 10000))
+
+
+def mode_key(mode):
+    """A key for the black version and mode, which decide whether a file
+    is formatted."""
+    import black  # pylint: disable=import-outside-toplevel
+
+    key = '{} {}'.format(black.__version__, mode.get_cache_key())
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def connect(path=None):
+    """Open the cache database, creating it if need be. Returns None if
+    it cannot be opened."""
+    path = path or os.path.join(cache_dir(), DB_NAME)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript(_SCHEMA)
+    except (OSError, sqlite3.Error) as exception:
+        logging.debug('Cannot open format cache %s: %s', path, exception)
+        return None
+    return db
+
+
+class FormatCache:
+    """The formatted files for one mode key. Lookups read the database
+    as they go; the files found formatted are written by record(), in a
+    single transaction."""
+
+    def __init__(self, key, path=None):
+        self.key = key
+        self.db = connect(path) if resultcache.cache_enabled() else None
+        # The [path, mtime_ns, size, digest] of the files hashed or looked
+        # up, by real path, and the digests which were hits.
+        self.files = {}
+        self.used = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _query(self, sql, args):
+        try:
+            return self.db.execute(sql, args).fetchone()
+        except sqlite3.Error as exception:
+            logging.debug('Format cache query failed: %s', exception)
+            return None
+
+    def file_digest(self, file):
+        """The digest of file's contents. It is taken from the cache if
+        the file's modification time and size are unchanged; otherwise the
+        file is hashed."""
+        path = os.path.realpath(file)
+        stat = os.stat(path)
+        row = self._query(
+            'SELECT mtime_ns, size, digest FROM files WHERE path = ?', (path,)
+        )
+        if row and row[:2] == (stat.st_mtime_ns, stat.st_size):
+            digest = row[2]
+        else:
+            digest = resultcache.file_digest(path)
+        self.files[path] = (path, stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def is_formatted(self, file):
+        """True if the cache records file's contents as formatted."""
+        if self.db is None:
+            return False
+        try:
+            digest = self.file_digest(file)
+        except OSError:
+            return False
+        row = self._query(
+            'SELECT 1 FROM formatted WHERE mode = ? AND digest = ?',
+            (self.key, digest),
+        )
+        if row is None:
+            return False
+        self.used.add(digest)
+        return True
+
+    def record(self, formatted=()):
+        """Record the files in formatted as formatted, mark the hits as
+        used, and evict the least recently used digests past
+        max_entries()."""
+        if self.db is None:
+            return
+        digests = set(self.used)
+        for file in formatted:
+            # is_formatted() already took the digest of the files it saw.
+            entry = self.files.get(os.path.realpath(file))
+            if entry is not None:
+                digests.add(entry[3])
+                continue
+            try:
+                digests.add(self.file_digest(file))
+            except OSError:
+                continue
+        now = time.time()
+        try:
+            with self.db:
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO formatted VALUES (?, ?, ?)',
+                    [(self.key, digest, now) for digest in digests],
+                )
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                    [
+                        entry
+                        for entry in self.files.values()
+                        if entry[3] in digests
+                    ],
+                )
+                (count,) = self.db.execute(
+                    'SELECT COUNT(*) FROM formatted'
+                ).fetchone()
+                if count > max_entries():
+                    self._evict(count - max_entries())
+        except sqlite3.Error as exception:
+            logging.debug('Cannot write format cache: %s', exception)
+
+    def _evict(self, excess):
+        """Delete the excess least recently used digests and the files
+        which have them."""
+        self.db.execute(
+            'DELETE FROM formatted WHERE rowid IN '
+            '(SELECT rowid FROM formatted ORDER BY last_used LIMIT ?)',
+            (excess,),
+        )
+        self.db.execute(
+            'DELETE FROM files WHERE digest NOT IN '
+            '(SELECT digest FROM formatted)'
+        )
@@ -0,0 +1,121 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" The reformatted file from clang-format's replacements. Given the
+    <replacements> XML clang-format writes with --output-replacements-xml,
+    the replacements are applied to the lines they touch; every other line
+    is known to be unchanged. The lines are then diffed whole with
+    difflib, as the reformatted file's lines would be, so the diff is the
+    one difflib.context_diff() gives for clang-format's full output. """
+
+import bisect
+import xml.etree.ElementTree as ElementTree
+
+
+def parse_replacements(xml):
+    """Return a sorted list of (offset, length, text) tuples, offsets and
+    lengths in bytes and text as bytes, from clang-format's replacements
+    XML. Raises ValueError if the XML cannot be parsed."""
+    try:
+        root = ElementTree.fromstring(xml)
+    except ElementTree.ParseError as exception:
+        raise ValueError(str(exception)) from exception
+    replacements = []
+    for element in root.iter('replacement'):
+        replacements.append(
+            (
+                int(element.get('offset')),
+                int(element.get('length')),
+                (element.text or '').encode('utf-8'),
+            )
+        )
+    replacements.sort()
+    return replacements
+
+
+def _line_starts(data):
+    """The byte offset of the start of each line of data."""
+    starts = [0]
+    index = data.find(b'\n')
+    while index != -1:
+        starts.append(index + 1)
+        index = data.find(b'\n', index + 1)
+    return starts
+
+
+def changed_regions(data, replacements):
+    """Group replacements into regions of whole lines. Yields tuples of
+    (first line, end line, new lines) where lines first to end (exclusive)
+    of data are replaced by the list of byte strings new lines."""
+    starts = _line_starts(data)
+
+    def line_of(offset):
+        return bisect.bisect_right(starts, offset) - 1
+
+    def line_end(line):
+        return starts[line + 1] - 1 if line + 1 < len(starts) else len(data)
+
+    region = None
+    for offset, length, text in replacements:
+        first, last = line_of(offset), line_of(offset + length)
+        if region and first <= region[1]:
+            region[1] = max(region[1], last)
+            region[2].append((offset, length, text))
+            continue
+        if region:
+            yield _apply(data, starts, line_end, region)
+        region = [first, last, [(offset, length, text)]]
+    if region:
+        yield _apply(data, starts, line_end, region)
+
+
+def _apply(data, starts, line_end, region):
+    """Apply a region's replacements to its lines."""
+    first, last, replacements = region
+    begin = starts[first]
+    pieces = []
+    position = begin
+    for offset, length, text in replacements:
+        pieces.append(data[position:offset])
+        pieces.append(text)
+        position = max(position, offset + length)
+    pieces.append(data[position : line_end(last)])
+    return first, last + 1, b''.join(pieces).split(b'\n')
+
+
+def reformatted_lines(data, replacements, encoding='utf-8'):
+    """Return the lines of data, as text, and the lines of data after the
+    replacements are made. Raises UnicodeDecodeError if data is not in the
+    given encoding."""
+    lines = data.split(b'\n')
+    a = [line.decode(encoding) for line in lines]
+    b = []
+    position = 0
+    for first, end, new_lines in changed_regions(data, replacements):
+        b.extend(a[position:first])
+        b.extend(line.decode(encoding) for line in new_lines)
+        position = end
+    b.extend(a[position:])
+    return a, b
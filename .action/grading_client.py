@@ -0,0 +1,141 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Thin client for the grading daemon. A checker calls delegate() before
+    importing anything heavy; if a daemon is listening the check is run
+    there and this process exits with the check's status. Otherwise
+    delegate() returns and the checker runs locally as usual.
+
+    Each checkout has its own daemon, so a check never runs against another
+    checkout's code. The socket is $GRADER_SOCKET, or
+    /tmp/cpsc-grader-<uid>-<checkout>.sock when that is not set. The daemon
+    refuses, and the check runs locally, when the script is not in its
+    checkout or when the variables in CONTEXT_VARIABLES differ from its
+    own. Standard input is not passed on, so a check whose standard input
+    is a pipe or a file runs locally too. Set GRADER_NO_DAEMON=1 to always
+    run locally. """
+
+import hashlib
+import json
+import os
+import os.path
+import socket
+import stat
+import sys
+
+# The checkout this client belongs to, the parent of .action.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Settings outside GRADER_ which change how a check runs: where the tools
+# and Python packages are found.
+CONTEXT_VARIABLES = ('PATH', 'PYTHONPATH', 'HOME')
+
+
+def socket_path():
+    """Return the path of the Unix domain socket of this checkout's
+    daemon."""
+    checkout = hashlib.sha256(
+        ROOT_DIR.encode('utf-8', 'surrogateescape')
+    ).hexdigest()[:12]
+    return os.environ.get(
+        'GRADER_SOCKET',
+        '/tmp/cpsc-grader-{}-{}.sock'.format(os.getuid(), checkout),
+    )
+
+
+def context_environment():
+    """The values of CONTEXT_VARIABLES, None for those not set."""
+    return {name: os.environ.get(name) for name in CONTEXT_VARIABLES}
+
+
+def _stdin_has_input():
+    """True if standard input is a pipe or a file, which the check might
+    read but the daemon cannot."""
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISREG(mode)
+
+
+def forwarded_environment():
+    """The GRADER_ settings which apply to the check itself, such as
+    GRADER_RESULTS or GRADER_TIMING, to be set in the daemon while it runs
+    the check."""
+    return {
+        name: value
+        for name, value in os.environ.items()
+        if name.startswith('GRADER_')
+        and name not in ('GRADER_SOCKET', 'GRADER_NO_DAEMON')
+    }
+
+
+def delegate(script=None, argv=None):
+    """Ask the daemon to run script (default: the running script) with
+    argv (default: the command line arguments). Exits with the check's
+    status when the daemon ran it; returns if there is no daemon."""
+    if os.environ.get('GRADER_NO_DAEMON') or _stdin_has_input():
+        return
+    path = socket_path()
+    if not os.path.exists(path):
+        return
+    if script is None:
+        script = sys.argv[0]
+    if argv is None:
+        argv = sys.argv[1:]
+    request = {
+        'script': os.path.realpath(script),
+        'argv': list(argv),
+        'cwd': os.getcwd(),
+        'env': forwarded_environment(),
+        'root': ROOT_DIR,
+        'context': context_environment(),
+    }
+    try:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    except OSError:
+        return
+    received_output = False
+    with connection, connection.makefile('rwb') as channel:
+        try:
+            channel.write(json.dumps(request).encode('utf-8') + b'\n')
+            channel.flush()
+            for line in channel:
+                message = json.loads(line)
+                if 'out' in message:
+                    received_output = True
+                    sys.stdout.write(message['out'])
+                    sys.stdout.flush()
+                elif 'exit' in message:
+                    sys.exit(message['exit'])
+                elif 'refused' in message:
+                    break
+        except (OSError, ValueError):
+            pass
+    if received_output:
+        sys.stdout.write('Lost connection to the grading daemon.\n')
+        sys.exit(1)
+    # The daemon went away before doing anything; run locally instead.
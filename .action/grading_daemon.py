@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" A long lived grading daemon. The checker modules are imported and the
+    logger is set up once; each request is then served by a forked copy of
+    this warm process. Requests arrive over a Unix domain socket as one
+    JSON line, {"script": ..., "argv": [...], "cwd": ..., "env": {...},
+    "root": ..., "context": {...}}, and the check's output is streamed back
+    as JSON lines, {"out": text}, followed by {"exit": status}. A request
+    from another checkout, for a script outside this one, or with other
+    context variables is answered with {"refused": reason} and the client
+    runs the check itself. The checkers find the daemon through
+    grading_client.delegate().
+
+    ex.
+    .action/grading_daemon.py &
+    python3 part-1/check_formatting
+"""
+
+import json
+import logging
+import os
+import os.path
+import signal
+import socketserver
+import sys
+from logger import setup_logger
+import grading_client
+from grading_client import socket_path
+from scriptrunner import run_script
+import resultcache
+
+# Everything the checkers import is loaded before the first fork.
+import header_check  # pylint: disable=unused-import
+import mkcompiledb  # pylint: disable=unused-import
+import parse_header  # pylint: disable=unused-import
+import run_check  # pylint: disable=unused-import
+import srcutilities  # pylint: disable=unused-import
+
+try:
+    import pexpect  # pylint: disable=unused-import
+except ImportError:
+    pass
+
+try:
+    # pylint_check_many() runs pylint in the checker's process.
+    import pylint.lint  # pylint: disable=unused-import
+except ImportError:
+    pass
+
+
+class _SocketStream:
+    """A text stream which sends everything written to it to the client
+    as {"out": text} messages."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def write(self, text):
+        """Send text to the client."""
+        if text:
+            self.channel.write(
+                json.dumps({'out': text}).encode('utf-8') + b'\n'
+            )
+            self.channel.flush()
+        return len(text)
+
+    def flush(self):
+        """Everything is sent as it is written."""
+
+    def isatty(self):
+        """The client's terminal is not ours."""
+        return False
+
+
+def refusal(request):
+    """The reason this daemon cannot run request as the client would, or
+    None if it can."""
+    root = grading_client.ROOT_DIR
+    if request.get('root') != root:
+        return 'the daemon serves {}'.format(root)
+    script = os.path.realpath(request['script'])
+    if os.path.commonpath([script, root]) != root:
+        return '{} is not in {}'.format(script, root)
+    if request.get('context') != grading_client.context_environment():
+        return 'the environment differs from the daemon\'s'
+    return None
+
+
+class GradingRequestHandler(socketserver.StreamRequestHandler):
+    """Run one check in the forked child handling the connection."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            script = request['script']
+            argv = request.get('argv', [])
+            cwd = request.get('cwd', os.getcwd())
+            env = {
+                str(name): str(value)
+                for name, value in request.get('env', {}).items()
+            }
+            reason = refusal(request)
+        except (ValueError, KeyError, TypeError):
+            self.wfile.write(b'{"exit": 2}\n')
+            return
+        if reason:
+            logging.debug('Refused %s: %s', script, reason)
+            self.wfile.write(
+                json.dumps({'refused': reason}).encode('utf-8') + b'\n'
+            )
+            return
+        # A check run by the daemon must not try to delegate to it again.
+        os.environ['GRADER_NO_DAEMON'] = '1'
+        stream = _SocketStream(self.wfile)
+        try:
+            status = run_script(script, argv, cwd, stream, env)
+            self.wfile.write(
+                json.dumps({'exit': status}).encode('utf-8') + b'\n'
+            )
+        except OSError:
+            logging.debug('Client went away while running %s', script)
+
+
+class GradingServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """Serve every connection from a fresh fork of the daemon."""
+
+
+def _stop(signum, frame):
+    """Shut down cleanly on SIGTERM as well as on an interrupt."""
+    raise KeyboardInterrupt
+
+
+def main():
+    """Main function; preload the checkers and serve requests until
+    interrupted."""
+    logger = setup_logger()
+    path = sys.argv[1] if len(sys.argv) > 1 else socket_path()
+    if os.path.exists(path):
+        os.unlink(path)
+    # Warm the tool version lookups used to build cache keys.
+    for tool in ('clang-format', 'clang-tidy', 'clang++'):
+        resultcache.tool_version(tool)
+    old_umask = os.umask(0o077)
+    try:
+        server = GradingServer(path, GradingRequestHandler)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, _stop)
+    logger.info('Grading daemon listening on %s', path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info('Grading daemon stopping.')
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
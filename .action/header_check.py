@@ -39,10 +39,17 @@
 //
 """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
-import logging
+import time
 from logger import setup_logger
-from parse_header import dict_header
+import results
+from parse_header import check_headers
 
 def header_check(file):
     """ Check file's header if it conforms to the standard given \
@@ -63,19 +70,7 @@ def header_check(file):
     #//
 
     # return true if header is good
-    keys = ['name', 'class', 'email', 'github', 'asgt', 'partners', 'comment']
-    with open(file) as file_handle:
-        contents = file_handle.read()
-    header = dict_header(contents)
-    status = True
-    if header:
-        for k in keys:
-            if not k in header.keys():
-                logging.warning('%s: missing %s', file, k)
-                status = False
-    else:
-        status = False
-    return status
+    return check_headers([file])[file][0]
 
 
 def get_header_and_check(file):
@@ -97,19 +92,7 @@ def get_header_and_check(file):
     #//
 
     # return true if header is good
-    keys = ['name', 'class', 'email', 'github', 'asgt', 'partners', 'comment']
-    with open(file) as file_handle:
-        contents = file_handle.read()
-    header = dict_header(contents)
-    status = True
-    if header:
-        for k in keys:
-            if not k in header.keys():
-                logging.warning('%s: missing %s', file, k)
-                status = False
-    else:
-        status = False
-    return (status, header)
+    return check_headers([file])[file]
 
 def main():
     """ Main function; process each file given through get_header_and_check. """
@@ -117,9 +100,18 @@ def main():
     status = 0
     if len(sys.argv) < 2:
         logger.warning('Only %s arguments provided.', len(sys.argv))
+    run_start = time.perf_counter()
     for in_file in sys.argv[1:]:
         logger.info('Check header for file: %s', in_file)
+        start = time.perf_counter()
         has_header, header_d = get_header_and_check(in_file)
+        results.emit(
+            'header',
+            has_header,
+            in_file,
+            time.perf_counter() - start,
+            header=header_d,
+        )
         if not has_header:
             logger.warning('Header is malformed or missing.')
             logger.warning('Could not find a header in the file.')
@@ -137,6 +129,9 @@ def main():
             logger.info("Lab: %s", header_d['asgt'])
             logger.info("Partners: %s", header_d['partners'])
             logger.info("Comment: %s", header_d['comment'])
+    results.emit(
+        'header', status == 0, duration=time.perf_counter() - run_start
+    )
     sys.exit(status)
 
 if __name__ == '__main__':
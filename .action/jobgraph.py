@@ -0,0 +1,173 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" A small job graph executor. Independent checks (clang-format per file,
+    clang-tidy per file, the build) run concurrently on a bounded process
+    pool while their results and log messages are handed back in the order
+    the jobs were declared. """
+
+import collections
+import concurrent.futures
+import logging
+import os
+import time
+import timing
+
+Job = collections.namedtuple(
+    'Job', ['name', 'func', 'args', 'kwargs', 'deps'], defaults=((), {}, ())
+)
+Job.__doc__ = """A unit of work. `deps` is a sequence of job names which must
+finish before this job is started."""
+
+JobResult = collections.namedtuple(
+    'JobResult', ['value', 'records', 'error', 'duration', 'spans']
+)
+
+
+class _RecordCollector(logging.Handler):
+    """Hold on to every log record emitted while a job runs in a worker
+    process so the parent can replay them in a deterministic order."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        # Format the message now; arguments may not survive pickling.
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+def _run_job(func, args, kwargs):
+    """Worker side of a job. Log records are captured rather than written
+    so that concurrent jobs do not interleave their output."""
+    root = logging.getLogger()
+    saved_handlers = root.handlers[:]
+    collector = _RecordCollector()
+    root.handlers = [collector]
+    bookmark = timing.mark()
+    start = time.perf_counter()
+    try:
+        value = func(*args, **kwargs)
+        error = None
+    except Exception as exception:  # pylint: disable=broad-except
+        value = None
+        error = '{}: {}'.format(type(exception).__name__, exception)
+    finally:
+        root.handlers = saved_handlers
+    return JobResult(
+        value,
+        collector.records,
+        error,
+        time.perf_counter() - start,
+        timing.spans_since(bookmark),
+    )
+
+
+def default_workers():
+    """The number of worker processes to use when none is given: one per
+    CPU, or $GRADER_WORKERS when it is set."""
+    try:
+        return max(1, int(os.environ.get('GRADER_WORKERS', '')))
+    except ValueError:
+        return max(1, os.cpu_count() or 1)
+
+
+def run_jobs(jobs, max_workers=None):
+    """Run the jobs on a process pool of at most max_workers processes,
+    honoring each job's dependencies. Returns an ordered dictionary of
+    job name to JobResult in the order the jobs were given."""
+    jobs = list(jobs)
+    by_name = {job.name: job for job in jobs}
+    if len(by_name) != len(jobs):
+        raise ValueError('Job names must be unique.')
+    for job in jobs:
+        for dep in job.deps:
+            if dep not in by_name:
+                raise ValueError(
+                    'Job {} depends on unknown job {}.'.format(job.name, dep)
+                )
+    if not max_workers:
+        max_workers = default_workers()
+    max_workers = min(max_workers, max(1, len(jobs)))
+    results = {}
+    waiting = list(jobs)
+    running = {}
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers
+    ) as executor:
+        while waiting or running:
+            ready = [
+                job
+                for job in waiting
+                if all(dep in results for dep in job.deps)
+            ]
+            for job in ready:
+                waiting.remove(job)
+                future = executor.submit(
+                    _run_job, job.func, tuple(job.args), dict(job.kwargs)
+                )
+                running[future] = job.name
+            if not running:
+                raise ValueError(
+                    'Job graph has a cycle: {}'.format(
+                        ', '.join(job.name for job in waiting)
+                    )
+                )
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as exception:  # pylint: disable=broad-except
+                    results[name] = JobResult(
+                        None,
+                        [],
+                        '{}: {}'.format(type(exception).__name__, exception),
+                        None,
+                        [],
+                    )
+    return collections.OrderedDict(
+        (job.name, results[job.name]) for job in jobs
+    )
+
+
+def replay(result, logger=None):
+    """Emit the log records captured while the job ran through the logger
+    (the root logger by default) and return the job's value. Spans timed
+    in the worker are added to this process's timings."""
+    if not logger:
+        logger = logging.getLogger()
+    timing.merge(result.spans)
+    for record in result.records:
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+    if result.error:
+        logger.error('Internal error: %s', result.error)
+    return result.value
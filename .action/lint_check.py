@@ -27,11 +27,19 @@
 """ Check the given files to see if they conform to good programming
     practices using clang-tidy. """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
 import logging
 import os.path
+import time
 from logger import setup_logger
-from srcutilities import lint_check
+import results
+from srcutilities import lint_check_many
 
 def main():
     """ Main function; process each file given through the linter. """
@@ -40,18 +48,28 @@ def main():
         logger.warning('Only %s arguments provided.', len(sys.argv))
         logger.warning('Provide a list of files to check.')
     status = 0
+    # Lint every file in one batch, then report on each in turn.
+    run_start = time.perf_counter()
+    all_warnings = lint_check_many(
+        [in_file for in_file in sys.argv[1:] if os.path.exists(in_file)]
+    )
     for in_file in sys.argv[1:]:
         logger.info('Linting file: %s', in_file)
         if not os.path.exists(in_file):
             logger.debug('File %s does not exist. Continuing.', in_file)
+            results.emit('lint', 'skipped', in_file, reason='missing file')
             continue
-        lint_warnings = lint_check(in_file)
+        lint_warnings = all_warnings[in_file]
+        results.emit(
+            'lint', len(lint_warnings) == 0, in_file, warnings=lint_warnings
+        )
         if len(lint_warnings) != 0:
             logger.error('Linter found improvements.')
             logger.warning('\n'.join(lint_warnings))
             status = 1
         else:
             logger.info('Linting passed')
+    results.emit('lint', status == 0, duration=time.perf_counter() - run_start)
     sys.exit(status)
 
 
@@ -35,25 +35,26 @@ import logging
 from logger import setup_logger
 
 
-def create_clang_compile_commands_db(
-    files=None, remove_existing_db=False, compile_cmd=None
-):
-    """Create a Clang compile commands DB named
-    compile_commands.json in the current working directory."""
-    out = 'compile_commands.json'
+def platform_compile_cmd(compile_cmd=None):
+    """Return the compile command, or the default one, with the include
+    paths this platform needs appended."""
     linux_includes = ' -I/usr/include/c++/9/'
     darwin_includes = ' -D OSX -nostdinc++ -I/opt/local/include/libcxx/v1'
     my_platform = platform.system()
-    logger = setup_logger()
     if not compile_cmd:
         compile_cmd = 'clang++ -g -O3 -Wall -pipe -std=c++14'
     if my_platform == 'Linux':
         compile_cmd = compile_cmd + linux_includes
     elif my_platform == 'Darwin':
         compile_cmd = compile_cmd + darwin_includes
-    if not files:
-        files = glob.glob('*.cc')
-    compile_commands_db = [
+    return compile_cmd
+
+
+def compile_commands_entries(files, compile_cmd=None):
+    """Return the compile commands DB entries for files compiled with
+    compile_cmd."""
+    compile_cmd = platform_compile_cmd(compile_cmd)
+    return [
         {
             'directory': '/tmp',
             'command': '{} {}'.format(compile_cmd, f),
@@ -61,6 +62,13 @@ def create_clang_compile_commands_db(
         }
         for f in files
     ]
+
+
+def write_compile_commands_db(
+    compile_commands_db, remove_existing_db=False, out='compile_commands.json'
+):
+    """Write the list of compile commands DB entries to out."""
+    logger = setup_logger()
     if exists(out) and remove_existing_db:
         logger.debug('Removing %s', out)
         os.unlink(out)
@@ -75,5 +83,17 @@ def create_clang_compile_commands_db(
             json.dump(compile_commands_db, file_handle)
 
 
+def create_clang_compile_commands_db(
+    files=None, remove_existing_db=False, compile_cmd=None
+):
+    """Create a Clang compile commands DB named
+    compile_commands.json in the current working directory."""
+    if not files:
+        files = glob.glob('*.cc')
+    write_compile_commands_db(
+        compile_commands_entries(files, compile_cmd), remove_existing_db
+    )
+
+
 if __name__ == '__main__':
     create_clang_compile_commands_db()
@@ -38,20 +38,53 @@
 # // This is my first program and it prints out Hello World!
 # //
 
+import collections
+import logging
+import os
+import os.path
 import re
 
 #HEADER_REGEX = r"(#|/{2})[ \t]+([a-zA-Z0-9_-]+)[ \t]+([ a-zA-Z0-9_-]+)\s+(#|/{2})[ \t]+([a-zA-Z]{4}[ \t]+\d\d\d-\d\d)\s+(#|/{2})[ \t]+\d\d\d\d-\d\d?-\d\d?\s+(#|/{2})[ \t]+(\w+[.-_0-9\w]*@csu\.fullerton\.edu)\s+(#|/{2})[ \t]+@([a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38})\s+(#|/{2})\s*\s+(#|/{2})[ \t]+(Lab \d\d-\d\d)\n(#|/{2})\s+Partners:\s+(@[a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38})\s+(#|/{2})\s*\n(#|/{2}) (\w+.*)\s+(#|/{2})"
 HEADER_REGEX = r"(#|/{2})[ \t]+([a-zA-Z0-9_-]+)[ \t]+([ a-zA-Z0-9_-]+)\s+(#|/{2})[ \t]+([a-zA-Z]{4}[ \t]+\d\d\d-\d\d)\s+(#|/{2})[ \t]+\d\d\d\d-\d\d?-\d\d?\s+(#|/{2})[ \t]+(\w+[.-_0-9\w]*@csu\.fullerton\.edu)\s+(#|/{2})[ \t]+@([a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38})\s+(#|/{2})\s*\s+(#|/{2})[ \t]+(Lab \d\d-\d\d)\n(#|/{2})\s+Partners:\s+(@([a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38})(,\s?@([a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38}))?)\s+(#|/{2})\s*\n(#|/{2})\s+(\w+.*)\s+(#|/{2})"
 
 
+HEADER_RE = re.compile(HEADER_REGEX)
+
+# The header is expected at the top of the file; only this many lines are
+# searched.
+HEADER_MAX_LINES = 40
+
+# The keys a complete C++ header has. Python headers have no partners.
+HEADER_KEYS = ('name', 'class', 'email', 'github', 'asgt', 'partners', 'comment')
+PY_HEADER_KEYS = ('name', 'class', 'email', 'github', 'asgt', 'comment')
+
+# How many files' headers file_header() remembers; the oldest are dropped.
+FILE_HEADERS_MAX_ENTRIES = 4096
+
+# The header of each file read, by real path, with the modification time
+# and size it was read at.
+_file_headers = {}
+
+
+def _head(contents, max_lines=HEADER_MAX_LINES):
+    """Return the first max_lines lines of contents."""
+    end = -1
+    for _ in range(max_lines):
+        end = contents.find('\n', end + 1)
+        if end == -1:
+            return contents
+    return contents[: end + 1]
+
+
 def parse_header(contents, keyword=None):
     """Given Given a single string, parse the header and return the keyword's value."""
-    header_re = re.compile(HEADER_REGEX)
-    matches = re.findall(header_re, contents)
+    match = HEADER_RE.search(_head(contents))
     value = None
     header_matches = None
-    if len(matches) >= 1:
-        header_matches = matches[0]
+    matches = None
+    if match:
+        header_matches = match.groups()
+        matches = header_matches
     if header_matches:
         if keyword == 'name':
             value = '"{} {}"'.format(matches[1], matches[2])
@@ -75,11 +108,10 @@ def parse_header(contents, keyword=None):
 def dict_header(contents):
     """Given a single string, parse the header and return the result
     as a dictionary with the keys class, email, github, asgt, comment."""
-    header_re = re.compile(HEADER_REGEX)
-    matches = re.findall(header_re, contents)
+    match = HEADER_RE.search(_head(contents))
     header_d = None
-    if len(matches) >= 1:
-        matches = matches[0]
+    if match:
+        matches = match.groups()
         header_d = {
             'name': '{} {}'.format(matches[1], matches[2]),
             'class': matches[4],
@@ -90,3 +122,44 @@ def dict_header(contents):
             'comment': matches[-2],
         }
     return header_d
+
+
+def file_header(file):
+    """Given a file name, parse the header at the top of the file and
+    return it as a dictionary (see dict_header). Results are remembered
+    until the file's modification time or size changes."""
+    stat = os.stat(file)
+    path = os.path.realpath(file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if path not in _file_headers or _file_headers[path][0] != stamp:
+        lines = []
+        with open(file) as file_handle:
+            for line in file_handle:
+                lines.append(line)
+                if len(lines) == HEADER_MAX_LINES:
+                    break
+        _file_headers.pop(path, None)
+        if len(_file_headers) >= FILE_HEADERS_MAX_ENTRIES:
+            del _file_headers[next(iter(_file_headers))]
+        _file_headers[path] = (stamp, dict_header(''.join(lines)))
+    header = _file_headers[path][1]
+    return dict(header) if header else None
+
+
+def check_headers(files, keys=HEADER_KEYS):
+    """Given a list of files, parse each file's header and check that it
+    has all the keys. Returns an ordered dictionary of file to a tuple of
+    whether the header is good and the header (see dict_header)."""
+    results = collections.OrderedDict()
+    for file in files:
+        header = file_header(file)
+        status = True
+        if header:
+            for k in keys:
+                if not k in header.keys():
+                    logging.warning('%s: missing %s', file, k)
+                    status = False
+        else:
+            status = False
+        results[file] = (status, header)
+    return results
@@ -27,11 +27,19 @@
 """ Check the given files to see if they conform to the Google C++
     Programming style using clang-format. """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
 import logging
 import os.path
+import time
 from logger import setup_logger
-from srcutilities import pyformat_check, glob_py_src_files
+import results
+from srcutilities import pyformat_check_many, glob_py_src_files
 
 
 def main():
@@ -51,13 +59,25 @@ def main():
     else:
         logger.warning('No source files in the repository.')
         status = 1
+    run_start = time.perf_counter()
+    check_files = []
     for in_file in src_files:
-        logger.info('Checking format for file: %s', in_file)
         if not os.path.exists(in_file):
             logger.debug('File %s does not exist. Continuing.', in_file)
-            continue
-        diff = pyformat_check(in_file)
-        if not diff:
+            results.emit('pyformat', 'skipped', in_file, reason='missing file')
+        else:
+            check_files.append(in_file)
+    # All the files are checked together, so only the total is timed.
+    diffs = pyformat_check_many(check_files)
+    for in_file, diff in diffs.items():
+        logger.info('Checking format for file: %s', in_file)
+        results.emit(
+            'pyformat',
+            'error' if diff is None else len(diff) == 0,
+            in_file,
+            diff_lines=len(diff) if diff is not None else None,
+        )
+        if diff is None:
             logger.warning("Error: Formatting needs improvement.")
             logger.warning("Black parse error.")
             status = 1
@@ -68,6 +88,9 @@ def main():
             status = 1
         else:
             logger.info('Formatting passed')
+    results.emit(
+        'pyformat', status == 0, duration=time.perf_counter() - run_start
+    )
     sys.exit(status)
 
 
@@ -44,10 +44,18 @@
 #
 """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
 import logging
+import time
 from logger import setup_logger
-from parse_header import dict_header
+import results
+from parse_header import PY_HEADER_KEYS, check_headers
 import srcutilities
 
 
@@ -57,20 +65,7 @@ def header_check(file):
     the header is good. """
 
     # return true if header is good
-    keys = ['name', 'class', 'email', 'github', 'asgt', 'comment']
-    with open(file) as file_handle:
-        contents = file_handle.read()
-    header = dict_header(contents)
-    status = True
-    if header:
-        for k in keys:
-            if not k in header.keys():
-                # This should be logger as in logger = logging.getLogger('mshafae')
-                logging.warning('%s: missing %s', file, k)
-                status = False
-    else:
-        status = False
-    return status
+    return check_headers([file], PY_HEADER_KEYS)[file][0]
 
 
 def get_header_and_check(file):
@@ -90,20 +85,7 @@ def get_header_and_check(file):
     # //
 
     # return true if header is good
-    keys = ['name', 'class', 'email', 'github', 'asgt', 'comment']
-    with open(file) as file_handle:
-        contents = file_handle.read()
-    header = dict_header(contents)
-    status = True
-    if header:
-        for k in keys:
-            if not k in header.keys():
-                # This should be logger as in logger = logging.getLogger('mshafae')
-                logging.warning('%s: missing %s', file, k)
-                status = False
-    else:
-        status = False
-    return (status, header)
+    return check_headers([file], PY_HEADER_KEYS)[file]
 
 
 def main():
@@ -122,9 +104,18 @@ def main():
     else:
         logger.warning('No source files in the repository.')
         status = 1
+    run_start = time.perf_counter()
     for in_file in src_files:
         logger.info('Checking header for file: %s', in_file)
+        start = time.perf_counter()
         has_header, header_d = get_header_and_check(in_file)
+        results.emit(
+            'pyheader',
+            has_header,
+            in_file,
+            time.perf_counter() - start,
+            header=header_d,
+        )
         if not has_header:
             logger.warning('Header is malformed or missing.')
             logger.warning('Could not find a Python header in the file.')
@@ -141,6 +132,9 @@ def main():
             logger.info("GitHub Handle: %s", header_d['github'])
             logger.info("Lab: %s", header_d['asgt'])
             logger.info("Comment: %s", header_d['comment'])
+    results.emit(
+        'pyheader', status == 0, duration=time.perf_counter() - run_start
+    )
     sys.exit(status)
 
 
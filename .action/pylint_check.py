@@ -27,11 +27,23 @@
 """ Check the given files to see if they conform to good programming
     practices using clang-tidy. """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
 import logging
 import os.path
+import time
 from logger import setup_logger
-from srcutilities import pylint_check, glob_py_src_files
+import results
+from srcutilities import (
+    pylint_check_many,
+    pylint_messages_text,
+    glob_py_src_files,
+)
 
 
 def main():
@@ -50,18 +62,37 @@ def main():
     else:
         logger.warning('No source files in the repository.')
         status = 1
+    run_start = time.perf_counter()
+    lint_files = []
     for in_file in src_files:
-        logger.info('Linting file: %s', in_file)
         if not os.path.exists(in_file):
             logger.debug('File %s does not exist. Continuing.', in_file)
-            continue
-        lint_has_passed, lint_warnings = pylint_check(in_file)
+            results.emit('pylint', 'skipped', in_file, reason='missing file')
+        else:
+            lint_files.append(in_file)
+    # All the files are linted by one pylint run, so only the total is
+    # timed.
+    lint_results = pylint_check_many(lint_files)
+    for in_file, (lint_has_passed, score, messages) in lint_results.items():
+        logger.info('Linting file: %s', in_file)
+        lint_warnings = pylint_messages_text(messages)
+        results.emit(
+            'pylint',
+            lint_has_passed,
+            in_file,
+            warnings=lint_warnings,
+            score=score,
+            messages=[message._asdict() for message in messages],
+        )
         if not lint_has_passed:
             logger.error('Linter found improvements.')
             logger.warning('\n'.join(lint_warnings))
             status = 1
         else:
             logger.info('Linting passed')
+    results.emit(
+        'pylint', status == 0, duration=time.perf_counter() - run_start
+    )
     sys.exit(status)
 
 
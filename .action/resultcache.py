@@ -0,0 +1,209 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" An on-disk, content-addressed cache for the results of the clang
+    tools. Entries are keyed by the hash of the source file's bytes, the
+    tool, the tool's version, and the options given to the tool. The cache
+    is bounded in size; the least recently used entries are evicted first.
+    Scanning the cache for them costs a directory walk, so a store only
+    evicts when EVICT_INTERVAL seconds have passed since the last eviction.
+
+    The cache lives in $GRADER_CACHE_DIR (default ~/.cache/cpsc-grader)
+    and is limited to $GRADER_CACHE_MAX_BYTES bytes (default 64 MiB). Set
+    GRADER_CACHE=0 to disable it. The settings are read each time they are
+    used, so a grading daemon follows those its clients forward. """
+
+import hashlib
+import json
+import logging
+import os
+import os.path
+import subprocess
+import tempfile
+import time
+
+
+def default_cache_dir():
+    """The directory the cache lives in."""
+    return os.environ.get(
+        'GRADER_CACHE_DIR',
+        os.path.join(os.path.expanduser('~'), '.cache', 'cpsc-grader'),
+    )
+
+
+def cache_max_bytes():
+    """The size the cache is limited to."""
+    return int(os.environ.get('GRADER_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def cache_enabled():
+    """False if the cache is disabled with GRADER_CACHE=0."""
+    return os.environ.get('GRADER_CACHE', '1') != '0'
+
+
+# Seconds between the evictions that stores trigger.
+EVICT_INTERVAL = 60
+
+_tool_versions = {}
+
+
+def tool_version(tool):
+    """Return the output of `tool --version`, memoized for the life of
+    the process. Returns an empty string when the tool cannot be run."""
+    if tool not in _tool_versions:
+        try:
+            proc = subprocess.run(
+                [tool, '--version'],
+                capture_output=True,
+                timeout=10,
+                check=False,
+                text=True,
+            )
+            _tool_versions[tool] = proc.stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            _tool_versions[tool] = ''
+    return _tool_versions[tool]
+
+
+def file_digest(file):
+    """Return the SHA-256 hex digest of the file's contents."""
+    digest = hashlib.sha256()
+    with open(file, 'rb') as file_handle:
+        for chunk in iter(lambda: file_handle.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(file, tool, options, *extra):
+    """Return the key for running tool with options over file. Anything
+    else which changes the tool's output, such as the compile command, is
+    passed through extra."""
+    digest = hashlib.sha256()
+    for part in (file_digest(file), tool, tool_version(tool), options) + extra:
+        digest.update(str(part).encode('utf-8', 'surrogateescape'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    """Entries are sharded into subdirectories by the key's prefix."""
+    return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+def lookup(key, cache_dir=None):
+    """Return the value stored under key or None if there is none."""
+    if not cache_enabled():
+        return None
+    path = _entry_path(key, cache_dir or default_cache_dir())
+    try:
+        with open(path) as file_handle:
+            value = json.load(file_handle)
+    except (OSError, ValueError):
+        return None
+    try:
+        # The modification time records when the entry was last used.
+        os.utime(path)
+    except OSError:
+        pass
+    logging.debug('Cache hit %s', key)
+    return value
+
+
+def store(key, value, cache_dir=None, max_bytes=None):
+    """Store a JSON serializable value under key and, if an eviction is
+    due, evict the least recently used entries should the cache have grown
+    past max_bytes."""
+    if not cache_enabled():
+        return
+    cache_dir = cache_dir or default_cache_dir()
+    path = _entry_path(key, cache_dir)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            'w', dir=os.path.dirname(path), suffix='.tmp', delete=False
+        ) as file_handle:
+            json.dump(value, file_handle)
+        os.replace(file_handle.name, path)
+    except OSError as exception:
+        logging.debug('Cannot write cache entry %s: %s', path, exception)
+        return
+    evict_if_due(cache_dir, max_bytes)
+
+
+def evict_if_due(cache_dir=None, max_bytes=None, suffix='.json'):
+    """Call evict() unless one for the same suffix ran in the last
+    EVICT_INTERVAL seconds. A stamp file in cache_dir records the time of
+    the last eviction, so the processes sharing the cache take turns."""
+    cache_dir = cache_dir or default_cache_dir()
+    stamp = os.path.join(cache_dir, '.evicted' + suffix)
+    try:
+        if time.time() - os.stat(stamp).st_mtime < EVICT_INTERVAL:
+            return
+    except OSError:
+        pass
+    try:
+        with open(stamp, 'a'):
+            pass
+        os.utime(stamp)
+    except OSError:
+        pass
+    evict(cache_dir, max_bytes, suffix)
+
+
+def evict(cache_dir=None, max_bytes=None, suffix='.json'):
+    """Remove the least recently used entries, the files ending in suffix,
+    until the cache is no larger than max_bytes."""
+    cache_dir = cache_dir or default_cache_dir()
+    if max_bytes is None:
+        max_bytes = cache_max_bytes()
+    entries = []
+    total = 0
+    try:
+        shards = list(os.scandir(cache_dir))
+    except OSError:
+        return
+    for shard in shards:
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if not entry.name.endswith(suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
@@ -0,0 +1,76 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Machine readable results. When $GRADER_RESULTS names a file, every
+    checker appends one JSON object per line to it alongside its usual log
+    output, for example
+
+    {"check": "format", "file": "part-1/main.cc", "status": "fail",
+     "duration": 0.41, "diff_lines": 12, "entry_point": "format_check.py",
+     "time": "2022-09-21T17:02:11.532190+00:00"}
+
+    status is one of pass, fail, skipped, or error. A record without a
+    file summarizes the whole run of a check. Lines are appended with a
+    single write so concurrent checkers may share one file. """
+
+import datetime
+import json
+import os
+import os.path
+import sys
+
+RESULTS_FILE_ENV = 'GRADER_RESULTS'
+
+
+def enabled():
+    """True if results are being recorded."""
+    return bool(os.environ.get(RESULTS_FILE_ENV))
+
+
+def emit(check, status, file=None, duration=None, **details):
+    """Append one result record. status may be given as a bool, meaning
+    pass or fail. Anything JSON serializable may be passed in details."""
+    path = os.environ.get(RESULTS_FILE_ENV)
+    if not path:
+        return
+    if isinstance(status, bool):
+        status = 'pass' if status else 'fail'
+    record = {
+        'check': check,
+        'file': file,
+        'status': status,
+        'duration': round(duration, 6) if duration is not None else None,
+    }
+    record.update(details)
+    record['entry_point'] = os.path.basename(sys.argv[0]) if sys.argv else None
+    record['time'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    line = json.dumps(record, default=str) + '\n'
+    file_descriptor = os.open(
+        path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+    )
+    try:
+        os.write(file_descriptor, line.encode('utf-8'))
+    finally:
+        os.close(file_descriptor)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Audit the headers of every student repository cloned into a single
+    directory. Every part-*/*.cc and every .py file of each repository is
+    checked with check_headers on a process pool and one report is written
+    with a row per file.
+
+    ex.
+    .action/roster_header_audit.py --format csv -o headers.csv ~/cpsc120/lab-02
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import glob
+import json
+import logging
+import os
+import os.path
+import sys
+from logger import setup_logger
+from parse_header import HEADER_KEYS, PY_HEADER_KEYS, check_headers
+from srctree import walk_sources
+
+FIELDS = (
+    'repo',
+    'file',
+    'name',
+    'email',
+    'github',
+    'asgt',
+    'partners',
+    'status',
+)
+
+
+def repo_files(repo):
+    """Return the C++ and Python source files of repo whose headers are
+    audited. Hidden directories such as .git and .python and files the
+    repository ignores are skipped."""
+    files = sorted(glob.glob(os.path.join(repo, 'part-*', '*.cc')))
+    files += sorted(path for _, path in walk_sources(repo, kinds=('py',)))
+    return files
+
+
+def audit_file(repo_and_file):
+    """Parse the header of one file and return its row of the report. The
+    status is the one check_headers() gives the student."""
+    repo, file = repo_and_file
+    keys = PY_HEADER_KEYS if file.endswith('.py') else HEADER_KEYS
+    row = dict.fromkeys(FIELDS, '')
+    row['repo'] = os.path.basename(os.path.normpath(repo))
+    row['file'] = os.path.relpath(file, repo)
+    try:
+        (good, header) = check_headers([file], keys)[file]
+    except (OSError, UnicodeDecodeError) as exception:
+        logging.debug('Cannot read %s: %s', file, exception)
+        row['status'] = 'unreadable'
+        return row
+    if not header:
+        row['status'] = 'missing'
+        return row
+    for k in FIELDS:
+        if k in header:
+            row[k] = header[k]
+    if good:
+        row['status'] = 'ok'
+    else:
+        row['status'] = 'incomplete'
+    return row
+
+
+def find_repos(roster_dir):
+    """Every directory in roster_dir is taken to be a student's repository."""
+    return sorted(
+        entry.path
+        for entry in os.scandir(roster_dir)
+        if entry.is_dir() and not entry.name.startswith('.')
+    )
+
+
+def write_report(rows, out, report_format):
+    """Write the rows to the open file out as JSON Lines or CSV."""
+    if report_format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    else:
+        for row in rows:
+            out.write(json.dumps(row) + '\n')
+
+
+def main():
+    """Main function; audit every repository in the roster directories."""
+    logger = setup_logger()
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('roster_dirs', nargs='+')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('-o', '--output', help='report file; default stdout')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    args = parser.parse_args()
+    work = []
+    for roster_dir in args.roster_dirs:
+        for repo in find_repos(roster_dir):
+            work += [(repo, file) for file in repo_files(repo)]
+    # The report may be going to stdout; keep the log out of it.
+    report_level = logging.INFO if args.output else logging.DEBUG
+    logger.log(report_level, 'Auditing %d files.', len(work))
+    with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+        rows = list(
+            executor.map(audit_file, work, chunksize=max(1, len(work) // 256))
+        )
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_report(rows, out, args.format)
+    else:
+        write_report(rows, sys.stdout, args.format)
+    missing = sum(1 for row in rows if row['status'] != 'ok')
+    logger.log(
+        report_level,
+        '%d of %d files have a missing or incomplete header.',
+        missing,
+        len(rows),
+    )
+
+
+if __name__ == '__main__':
+    main()
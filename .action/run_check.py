@@ -26,37 +26,37 @@
 #
 """ Run the files given as arguments with the provided arguments. """
 
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import os.path
 import os
 import sys
 import logging
-import subprocess
+import shlex
+import time
 from logger import setup_logger
+import cmdexec
+import results
+from timing import timed
 
 
+@timed
 def run(binary='asgt', args='', expect=None):
     """Run binary in a spawned. This run does not test."""
     status = True
     cmd = './' + binary
     if os.path.exists(cmd):
-        if len(args) > 0:
-            cmd = cmd + ' ' + args
-        proc = subprocess.run(
-            [cmd],
-            capture_output=True,
-            shell=True,
-            timeout=10,
-            check=False,
-            text=True,
-        )
+        proc = cmdexec.run([cmd] + shlex.split(args), timeout=10)
         if proc.stdout:
-            logging.info('Output (stdout): %s', str(proc.stdout).rstrip("\n\r"))
+            logging.info('Output (stdout): %s', proc.stdout.rstrip("\n\r"))
             if expect:
                 logging.info('Expected: %s', expect)
         if proc.stderr:
-            logging.warning(
-                'Errors (stderr): %s', str(proc.stderr).rstrip("\n\r")
-            )
+            logging.warning('Errors (stderr): %s', proc.stderr.rstrip("\n\r"))
         if proc.returncode != 0:
             status = False
     else:
@@ -84,7 +84,12 @@ def main():
         logging.info('Executing: "%s %s"', cmd, cmd_args)
     else:
         logging.info('Executing: "%s"', cmd)
-    if run(cmd, cmd_args, 'Hello your-name!'):
+    start = time.perf_counter()
+    ran_cleanly = run(cmd, cmd_args, 'Hello your-name!')
+    results.emit(
+        'run', ran_cleanly, cmd, time.perf_counter() - start, args=cmd_args
+    )
+    if ran_cleanly:
         logging.info(
             'Your program executed and exited cleanly.'
             ' Perform further testing to ensure that your program'
@@ -0,0 +1,88 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Run one of the command line checkers inside the current interpreter
+    as if it had been started from the shell. Used by the grading daemon
+    so a check does not pay for a fresh interpreter and fresh imports. """
+
+import logging
+import os
+import runpy
+import sys
+import timing
+
+
+def run_script(script, argv, cwd, stream, env=None):
+    """Run script with the arguments argv from the directory cwd. Everything
+    the script logs or prints is written to stream. The variables in env
+    are set for the duration of the run. Returns the script's exit
+    status."""
+    saved_cwd = os.getcwd()
+    saved_argv = sys.argv
+    saved_stdout = sys.stdout
+    saved_stderr = sys.stderr
+    handlers = [
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, logging.StreamHandler)
+    ]
+    saved_streams = [handler.setStream(stream) for handler in handlers]
+    saved_env = {name: os.environ.get(name) for name in (env or {})}
+    status = 0
+    try:
+        os.environ.update(env or {})
+        timing.reset()
+        timing.start_profile()
+        os.chdir(cwd)
+        sys.argv = [script] + list(argv)
+        sys.stdout = stream
+        sys.stderr = stream
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as exit_exception:
+        if exit_exception.code is None:
+            status = 0
+        elif isinstance(exit_exception.code, int):
+            status = exit_exception.code
+        else:
+            stream.write('{}\n'.format(exit_exception.code))
+            status = 1
+    except Exception:  # pylint: disable=broad-except
+        logging.exception('%s raised an exception.', script)
+        status = 1
+    finally:
+        timing.report()
+        stream.flush()
+        for handler, saved_stream in zip(handlers, saved_streams):
+            handler.setStream(saved_stream)
+        sys.stdout = saved_stdout
+        sys.stderr = saved_stderr
+        sys.argv = saved_argv
+        os.chdir(saved_cwd)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return status
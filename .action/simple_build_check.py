@@ -25,9 +25,17 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 """ Build the files given as arguments with a naive clang++ build. """
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
 import sys
 import logging
+import time
 from logger import setup_logger
+import results
 from srcutilities import build
 
 def main():
@@ -36,14 +44,21 @@ def main():
     if len(sys.argv) < 2:
         logging.warning('Only %s arguments provided.', len(sys.argv))
     status = 0
+    run_start = time.perf_counter()
     for in_file in sys.argv[1:]:
         logging.info('Checking build for %s', in_file)
-        if build(in_file):
+        start = time.perf_counter()
+        built = build(in_file)
+        results.emit('build', built, in_file, time.perf_counter() - start)
+        if built:
             logging.info('Build passed.')
         else:
             logging.error('Build failed. Halting check.')
             status = 1
             break
+    results.emit(
+        'build', status == 0, duration=time.perf_counter() - run_start
+    )
     sys.exit(status)
 
 if __name__ == '__main__':
@@ -25,7 +25,8 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 """ Check student's submission; requires the main file and the
-    template file from the original repository. """
+    template file from the original repository. Set GRADER_ASYNC=1 to use
+    the asyncio checker, asynccheck.solution_check_async(). """
 # pexpect documentation
 #  https://pexpect.readthedocs.io/en/stable/index.html
 
@@ -33,128 +34,47 @@
 # .action/solution_check_p1.py  part-1 asgt
 
 
-import logging
-import pexpect
+if __name__ == '__main__':
+    # Hand the check to the grading daemon when one is running.
+    from grading_client import delegate
+
+    delegate()
+
+import os
 import sys
 from srcutilities import solution_check_simple
+from testrunner import TestVector, run_test_vectors
 
+P1_TESTS = (
+    TestVector(
+        'No parameters',
+        r'(?i)\s*451\s+degrees\s+Fahrenheit\s+is\s+843.8[0-9]*\s+degrees\s+Celsius.',
+    ),
+)
 
-def run_p1(binary):
-    """Run part-1"""
-    status = True
-    values = ('No parameters',)
-    for index, val in enumerate(values):
-        logging.info('Test %d - %s', index + 1, val)
-        status = status and _run_p1(binary, val)
-        if not status:
-            logging.error("Did not receive expected response. Halting test.")
-            break
-    return status
-
-
-def _run_p1(binary, values):
-    """The actual test with the expected input and output"""
-    status = False
-    proc = pexpect.spawn(binary, timeout=1)
-    # proc.logfile = sys.stdout.buffer
-    values = list(map(str, values))
-    try:
-        proc.expect(
-            r'(?i)\s*451\s+degrees\s+Fahrenheit\s+is\s+843.8[0-9]*\s+degrees\s+Celsius.'
-        )
-        # proc.expect(
-        #     r'(?i)\s*The\s+distance\s+from\s+CSUF\s+to\s+Sacremento\s+is\s+614.1[0-9]*\s+kilometers\s+or\s+383.8[0-9]* miles.'
-        # )
-    except (pexpect.exceptions.TIMEOUT, pexpect.exceptions.EOF) as exception:
-        logging.error('Could not find expected output.')
-        logging.debug("%s", str(exception))
-        logging.debug(str(proc))
-        return status
+P2_TESTS = (
+    TestVector(
+        'No parameters',
+        r'(?i)\s*There\s+are\s+two\s+solutions\s+for\s+4x\^2\s+\+\s+7x\s+-\s+13\s+=\s+0.\s+The\s+first\s+is\s+1.1[0-9]*\s+and\s+the\s+second\s+is\s+-2.8[0-9]*\.\s+',
+    ),
+)
 
-    # proc.sendline(values[0])
+P3_TESTS = (TestVector('No parameters', r'(?i)\s*Hello\s+World!'),)
 
-    proc.expect(pexpect.EOF)
-    proc.close()
-    if proc.exitstatus == 0:
-        status = True
-    return status
+
+def run_p1(binary):
+    """Run part-1"""
+    return run_test_vectors(binary, P1_TESTS)
 
 
 def run_p2(binary):
     """Run part-2"""
-    status = True
-    values = ('No parameters',)
-    for index, val in enumerate(values):
-        logging.info('Test %d - %s', index + 1, val)
-        status = status and _run_p2(binary, val)
-        if not status:
-            logging.error("Did not receive expected response. Halting test.")
-            break
-    return status
-
-
-def _run_p2(binary, values):
-    """The actual test with the expected input and output"""
-    status = False
-    proc = pexpect.spawn(binary, timeout=1)
-    # proc.logfile = sys.stdout.buffer
-    values = list(map(str, values))
-    try:
-        # proc.expect(
-        #     r'(?i)\s*451\s+degrees\s+Fahrenheit\s+is\s+843.8[0-9]*\s+degrees\s+Celsius.'
-        # )
-        proc.expect(
-            r'(?i)\s*There\s+are\s+two\s+solutions\s+for\s+4x\^2\s+\+\s+7x\s+-\s+13\s+=\s+0.\s+The\s+first\s+is\s+1.1[0-9]*\s+and\s+the\s+second\s+is\s+-2.8[0-9]*\.\s+'
-        )
-    except (pexpect.exceptions.TIMEOUT, pexpect.exceptions.EOF) as exception:
-        logging.error('Could not find expected output.')
-        logging.debug("%s", str(exception))
-        logging.debug(str(proc))
-        return status
-
-    # proc.sendline(values[0])
-
-    proc.expect(pexpect.EOF)
-    proc.close()
-    if proc.exitstatus == 0:
-        status = True
-    return status
+    return run_test_vectors(binary, P2_TESTS)
 
 
 def run_p3(binary):
     """Run part-3"""
-    status = True
-    values = ('No parameters',)
-    for index, val in enumerate(values):
-        logging.info('Test %d - %s', index + 1, val)
-        status = status and _run_p3(binary, val)
-        if not status:
-            logging.error("Did not receive expected response. Halting test.")
-            break
-    return status
-
-
-def _run_p3(binary, values):
-    """The actual test with the expected input and output"""
-    status = False
-    proc = pexpect.spawn(binary, timeout=1)
-    # proc.logfile = sys.stdout.buffer
-    values = list(map(str, values))
-    try:
-        proc.expect(r'(?i)\s*Hello\s+World!')
-    except (pexpect.exceptions.TIMEOUT, pexpect.exceptions.EOF) as exception:
-        logging.error('Could not find expected output.')
-        logging.debug("%s", str(exception))
-        logging.debug(str(proc))
-        return status
-
-    # proc.sendline(values[0])
-
-    proc.expect(pexpect.EOF)
-    proc.close()
-    if proc.exitstatus == 0:
-        status = True
-    return status
+    return run_test_vectors(binary, P3_TESTS)
 
 
 if __name__ == '__main__':
@@ -167,12 +87,16 @@ if __name__ == '__main__':
         '{key: readability-identifier-naming.GlobalConstantCase,  value: UPPER_CASE}, '
         '{key: readability-identifier-naming.GlobalConstantPrefix, value: k} ]}"'
     )
+    solution_check = solution_check_simple
+    if os.environ.get('GRADER_ASYNC') == '1':
+        # pylint: disable-next=import-outside-toplevel
+        from asynccheck import solution_check_async as solution_check
     if sys.argv[1] == 'part-1':
-        solution_check_simple(
+        solution_check(
             run=run_p1, files=['celius_to_fahrenheit.cc'], do_lint_check=False
         )
     elif sys.argv[1] == 'part-2':
-        solution_check_simple(
+        solution_check(
             run=run_p2,
             files=['quadratic_formula.cc'],
             do_format_check=False,
@@ -180,7 +104,7 @@ if __name__ == '__main__':
             skip_compile_cmd=True,
         )
     elif sys.argv[1] == 'part-3':
-        solution_check_simple(
+        solution_check(
             run=run_p3,
             files=['hello.cc'],
             tidy_options=tidy_opts,
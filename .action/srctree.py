@@ -0,0 +1,173 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Find the source files in a directory tree in one pass. The tree is
+    read with os.scandir(), each file is classified by its extension, and
+    the matching files are yielded as they are found, so the caller can
+    start work before the walk is done. Hidden files and directories, the
+    directories in EXCLUDE_DIRS, and anything a .gitignore file in the
+    tree ignores are skipped.
+
+    Only the common .gitignore syntax is understood: blank lines and
+    comments, `*`, `?`, `**` and character classes, a leading `/` or an
+    inner `/` to anchor a pattern, a trailing `/` to match only
+    directories, and `!` to re-include a file. Escapes are not. """
+
+import os
+import os.path
+import re
+
+# File extensions and the kind of source they hold.
+SOURCE_KINDS = {'.cc': 'cc', '.h': 'h', '.py': 'py'}
+
+# Directories never searched: version control, the vendored Python
+# packages, and build output.
+EXCLUDE_DIRS = frozenset(['.git', '.python', '__pycache__', 'build'])
+
+GITIGNORE = '.gitignore'
+
+
+def _pattern_regex(pattern):
+    """Translate a .gitignore glob to a regular expression matching the
+    path relative to the .gitignore's directory."""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2 :]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1 : end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile(prefix + ''.join(parts) + r'\Z')
+
+
+def read_gitignore(path):
+    """Parse the .gitignore file at path. Returns a list of (regex,
+    negate, dir_only) rules in the order they appear."""
+    rules = []
+    try:
+        with open(path, encoding='utf-8', errors='replace') as fh:
+            lines = fh.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append((_pattern_regex(line), negate, dir_only))
+    return rules
+
+
+def _ignored(ignores, name, is_dir):
+    """True if the entry called name is ignored by the active .gitignore
+    rules. ignores is a list of (rules, rel_dir) pairs, outermost first,
+    where rel_dir is the entry's directory relative to the .gitignore
+    the rules came from. As with git, the last matching rule wins."""
+    ignored = False
+    for rules, rel_dir in ignores:
+        rel_path = rel_dir + name
+        for regex, negate, dir_only in rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                ignored = not negate
+    return ignored
+
+
+def walk_sources(
+    target_dir='.', kinds=None, exclude=EXCLUDE_DIRS, use_gitignore=True
+):
+    """Yield (kind, path) for every source file under target_dir, where
+    kind is the SOURCE_KINDS value for the file's extension. Only the
+    kinds given are yielded when kinds is not None. Paths are joined to
+    target_dir, and a directory's files come before those of its
+    subdirectories."""
+    stack = [(target_dir, [])]
+    while stack:
+        directory, ignores = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        if use_gitignore:
+            for entry in entries:
+                if entry.name == GITIGNORE:
+                    rules = read_gitignore(entry.path)
+                    if rules:
+                        ignores = ignores + [(rules, '')]
+                    break
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if name in exclude or _ignored(ignores, name, True):
+                    continue
+                subdirs.append(entry)
+                continue
+            kind = SOURCE_KINDS.get(os.path.splitext(name)[1])
+            if kind is None or (kinds is not None and kind not in kinds):
+                continue
+            if _ignored(ignores, name, False):
+                continue
+            yield kind, entry.path
+        for entry in reversed(subdirs):
+            nested = [
+                (rules, rel_dir + entry.name + '/')
+                for rules, rel_dir in ignores
+            ]
+            stack.append((entry.path, nested))
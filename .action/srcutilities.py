@@ -25,19 +25,36 @@
 #
 """ Utilities used to manipulate source code files from student
     assignments. """
+import collections
+import concurrent.futures
 import glob
 import subprocess
 import difflib
 import os.path
 import logging
 import re
+import shlex
 from datetime import datetime
 import sys
-import black
-from mkcompiledb import create_clang_compile_commands_db
+import threading
+import time
+from mkcompiledb import (
+    compile_commands_entries,
+    write_compile_commands_db,
+)
 from logger import setup_logger
-from parse_header import dict_header
-from header_check import header_check
+from workdir import job_dir
+from srctree import walk_sources
+from parse_header import check_headers
+from jobgraph import Job, run_jobs, replay, default_workers
+import resultcache
+import cmdexec
+import cppstrip
+import formatdiff
+import formatcache
+import buildcache
+import results
+from timing import span, timed
 
 
 def remove_python_comments(file):
@@ -83,13 +100,29 @@ def remove_python_comments(file):
 
 
 def remove_cpp_comments(file):
-    """Remove CPP comments from a file using the CPP preprocessor"""
+    """Remove C++ comments from a file and normalize its whitespace. The
+    file is scanned in-process; see cppstrip.normalize()."""
+    no_comments = None
+    try:
+        with open(file, 'rb') as file_handle:
+            contents = file_handle.read()
+        no_comments = cppstrip.normalize(contents).decode(
+            'utf-8', 'surrogateescape'
+        )
+    except FileNotFoundError as exception:
+        logging.error('Cannot remove comments. No such file. %s', file)
+    return no_comments
+
+
+@timed
+def remove_cpp_comments_clang(file):
+    """Remove CPP comments from a file using the CPP preprocessor. This is
+    the reference for remove_cpp_comments(); see bench_cppstrip.py."""
     # Inspired by
     # https://stackoverflow.com/questions/13061785/remove-multi-line-comments
     # and
     # https://stackoverflow.com/questions/35700193/how-to-find-a-search-term-in-source-code/35708616#35708616
     no_comments = None
-    cmd = 'clang++ -E -P -'
     try:
         with open(file) as file_handle:
             # replace 'a', '__' and '#' to avoid preprocessor handling
@@ -99,14 +132,10 @@ def remove_cpp_comments(file):
                 .replace('__', 'aB')
                 .replace('#', 'aC')
             )
-        proc = subprocess.run(
-            [cmd],
-            capture_output=True,
-            shell=True,
+        proc = cmdexec.run(
+            ['clang++', '-E', '-P', '-'],
             timeout=10,
-            check=False,
-            text=True,
-            input=filtered_contents,
+            input_bytes=filtered_contents.encode('utf-8'),
         )
         if proc.returncode == 0:
             no_comments = (
@@ -135,40 +164,99 @@ def makefile_has_compilecmd(target_makefile):
     return has_compilecmd
 
 
+# (directory, compiler) to the Makefiles' signature and compile command.
+_compilecmds = {}
+
+
+def _makefiles_signature(makefiles):
+    """Identify the current version of the Makefiles by their paths,
+    modification times, and sizes."""
+    signature = []
+    for makefile in makefiles:
+        try:
+            stat = os.stat(makefile)
+        except OSError:
+            continue
+        signature.append((makefile, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+@timed
 def makefile_get_compilecmd(target_dir, compiler='clang++'):
     """Given a Makefile with the compilecmd target, return the string
     which represents the compile command. For use with making the
-    compile database for linting."""
+    compile database for linting. The command is remembered per directory
+    until a Makefile's modification time changes and is kept in the
+    result cache under the Makefile's hash, so make runs once per
+    Makefile rather than once per file linted."""
+    makefiles = sorted(
+        glob.glob(os.path.join(target_dir, '*Makefile'), recursive=False)
+    )
+    memo_key = (os.path.realpath(target_dir), compiler)
+    signature = _makefiles_signature(makefiles)
+    memo = _compilecmds.get(memo_key)
+    if memo and memo[0] == signature:
+        return memo[1]
+    compilecmd = _discover_compilecmd(target_dir, makefiles, compiler)
+    _compilecmds[memo_key] = (signature, compilecmd)
+    return compilecmd
+
+
+def _discover_compilecmd(target_dir, makefiles, compiler):
+    """Ask make for the compile command of the first of makefiles with the
+    compilecmd target, consulting the result cache first."""
     logger = setup_logger()
     compilecmd = None
-    makefiles = glob.glob(
-        os.path.join(target_dir, '*Makefile'), recursive=False
-    )
     # Break on the first matched Makefile with compilecmd
-    matches = None
     for makefile in makefiles:
         if makefile_has_compilecmd(makefile):
-            cmd = 'make -C {} compilecmd'.format(target_dir)
-            proc = subprocess.run(
-                [cmd],
-                capture_output=True,
-                shell=True,
-                timeout=10,
-                check=False,
-                text=True,
+            key = resultcache.cache_key(
+                makefile,
+                'make',
+                'compilecmd',
+                os.path.realpath(target_dir),
+                compiler,
+            )
+            cached = resultcache.lookup(key)
+            if cached is not None:
+                compilecmd = cached[0]
+                break
+            proc = cmdexec.run(
+                ['make', '-C', target_dir, 'compilecmd'], timeout=10
             )
             matches = [
                 line
-                for line in str(proc.stdout).split('\n')
+                for line in proc.stdout.split('\n')
                 if line.startswith(compiler)
             ]
+            if matches:
+                compilecmd = matches[0]
+            if proc.returncode == 0:
+                resultcache.store(key, [compilecmd])
             break
-    if matches:
-        compilecmd = matches[0]
-    else:
+    if not compilecmd:
         logger.debug('Could not identify compile command; using default.')
     return compilecmd
 
+
+def prefetch_compilecmds(dirs, max_workers=None, compiler='clang++'):
+    """Discover the compile commands of many directories, for example many
+    cloned submissions, on at most max_workers threads (one per CPU by
+    default). Returns a dictionary of directory to compile command; later
+    makefile_get_compilecmd() calls for the directories are answered from
+    memory."""
+    dirs = list(collections.OrderedDict.fromkeys(dirs))
+    if not dirs:
+        return {}
+    workers = min(max_workers or default_workers(), len(dirs))
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        compilecmds = executor.map(
+            lambda directory: makefile_get_compilecmd(directory, compiler),
+            dirs,
+        )
+        return dict(zip(dirs, compilecmds))
+
+
 def strip_and_compare_files(base_file, submission_file):
     """ Compare two source files with a contextual diff, return \
     result as a list of lines. """
@@ -192,142 +280,575 @@ def strip_and_compare_files(base_file, submission_file):
     return list(diff)
 
 
-def format_check(file):
-    """ Use clang-format to check file's format against the \
-    Google C++ style. """
-    # logger = setup_logger()
-    # clang-format
-    cmd = 'clang-format'
-    cmd_options = '-style=Google --Werror'
-    cmd = cmd + ' ' + cmd_options + ' ' + file
-    # logger.debug('clang format: %s', cmd)
-    proc = subprocess.run(
-        [cmd],
-        capture_output=True,
-        shell=True,
-        timeout=10,
-        check=False,
-        text=True,
+def files_changed_from_base(files, base_directory):
+    """Compare each file, without comments, with its counterpart in
+    base_directory and log the files left unchanged. Returns False if no
+    file was changed. The solution checks call this before anything else
+    so an unchanged submission stops early."""
+    unchanged = 0
+    for file in files:
+        diff = strip_and_compare_files(
+            os.path.join(base_directory, file), file
+        )
+        if len(diff) == 0:
+            unchanged += 1
+            logging.error('No changes made to the file %s.', file)
+    if unchanged == len(files):
+        logging.error('No changes made to any files.')
+        return False
+    return True
+
+
+FORMAT_OPTIONS = ['-style=Google', '--Werror']
+
+# How much of clang-format's output is compared with the file at a time.
+FORMAT_CHUNK_BYTES = 64 * 1024
+
+
+def format_cache_key(file):
+    """The result cache key for clang-format's verdict on file."""
+    return resultcache.cache_key(file, 'clang-format', ' '.join(FORMAT_OPTIONS))
+
+
+@timed
+def format_is_clean(file, timeout=10):
+    """ Use clang-format to check file's format against the Google C++ \
+    style. Returns True if the file is formatted, False if it is not, and \
+    None if clang-format could not be run, failed, or timed out. \
+    clang-format's output is compared with the file as it is produced \
+    and clang-format is stopped at the first difference; use \
+    format_diff() to see the differences. """
+    try:
+        file_handle = open(file, 'rb')
+    except FileNotFoundError:
+        logging.error('Cannot check format. No such file. %s', file)
+        return None
+    with file_handle:
+        cached_diff = resultcache.lookup(format_cache_key(file))
+        if cached_diff is not None:
+            return len(cached_diff) == 0
+        try:
+            proc = cmdexec.popen(
+                ['clang-format'] + FORMAT_OPTIONS + [file],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as exception:
+            logging.error('Cannot run clang-format: %s', exception)
+            return None
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        differs = False
+        ended = False
+        with proc:
+            while not differs:
+                chunk = proc.stdout.read(FORMAT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                differs = file_handle.read(len(chunk)) != chunk
+            if differs:
+                proc.kill()
+            else:
+                # The output ended; the file is clean if it ends there too.
+                differs = bool(file_handle.read(1))
+                ended = True
+        timer.cancel()
+    if not ended:
+        # clang-format was stopped at the first difference.
+        return False
+    return format_verdict(file, differs, timed_out.is_set(), proc.returncode)
+
+
+def format_verdict(file, differs, timed_out, returncode):
+    """Decide format_is_clean() for file once all of clang-format's output
+    was compared with it: None if clang-format timed out or failed,
+    otherwise whether the output matched. A formatted file is recorded in
+    the result cache."""
+    if timed_out:
+        logging.error('clang-format timed out on %s.', file)
+        return None
+    if returncode != 0:
+        logging.error('clang-format failed on %s.', file)
+        return None
+    if not differs:
+        resultcache.store(format_cache_key(file), [])
+    return not differs
+
+
+def _format_lines_replacements(file, timeout):
+    """Ask clang-format for the replacements it would make to file and
+    return the lines of file, the lines of the reformatted file, and
+    clang-format's exit status. Returns None when the replacements cannot
+    be used; see format_diff()."""
+    proc = cmdexec.run(
+        ['clang-format'] + FORMAT_OPTIONS + ['--output-replacements-xml', file],
+        timeout=timeout,
     )
-    correct_format = str(proc.stdout).split('\n')
+    if proc.returncode != 0:
+        return None
+    with open(file, 'rb') as file_handle:
+        data = file_handle.read()
+    if b'\r' in data:
+        # Offsets count the carriage returns the line based diff drops.
+        return None
+    try:
+        replacements = formatdiff.parse_replacements(proc.stdout_bytes)
+        return (
+            *formatdiff.reformatted_lines(data, replacements),
+            proc.returncode,
+        )
+    except (ValueError, UnicodeDecodeError) as exception:
+        logging.debug('Cannot use replacements for %s: %s', file, exception)
+        return None
+
+
+def _format_lines_full(file, timeout):
+    """Ask clang-format for the reformatted file and return the lines of
+    file, the lines of the reformatted file, and clang-format's exit
+    status (None if it could not be run)."""
+    proc = cmdexec.run(['clang-format'] + FORMAT_OPTIONS + [file], timeout)
+    if proc.returncode is None:
+        logging.error('Cannot run clang-format: %s', proc.stderr)
     with open(file) as file_handle:
-        original_format = file_handle.read().split('\n')
-    diff = difflib.context_diff(
+        original_format = file_handle.read()
+    return (
+        original_format.split('\n'),
+        proc.stdout.split('\n'),
+        proc.returncode,
+    )
+
+
+def format_diff(file, timeout=10):
+    """ Use clang-format to reformat file in the Google C++ style and \
+    yield the lines of a contextual diff between file and the reformatted \
+    file. Nothing is yielded when the file is formatted. The reformatted \
+    file is built from clang-format's replacements, or from its full \
+    output when the replacements cannot be used. """
+    key = format_cache_key(file)
+    cached_diff = resultcache.lookup(key)
+    if cached_diff is not None:
+        yield from cached_diff
+        return
+    with span('format_diff'):
+        found = _format_lines_replacements(file, timeout)
+        if found is None:
+            found = _format_lines_full(file, timeout)
+    original_format, correct_format, returncode = found
+    diff = []
+    for line in difflib.context_diff(
         original_format,
         correct_format,
         'Student Submission (Yours)',
         'Correct Format',
         n=3,
+    ):
+        diff.append(line)
+        yield line
+    if returncode == 0:
+        resultcache.store(key, diff)
+
+
+def format_check(file):
+    """ Use clang-format to check file's format against the \
+    Google C++ style. Returns the contextual diff as a list of lines, \
+    empty when the file is formatted. """
+    if format_is_clean(file):
+        return []
+    return list(format_diff(file))
+
+
+DEFAULT_TIDY_ARGS = [
+    '-checks=-*,google-*,modernize-*,readability-*,cppcoreguidelines-*,'
+    '-google-build-using-namespace,'
+    '-google-readability-todo,'
+    '-modernize-use-trailing-return-type,'
+    '-cppcoreguidelines-avoid-magic-numbers,'
+    '-readability-magic-numbers,'
+    '-cppcoreguidelines-pro-type-union-access,'
+    '-cppcoreguidelines-pro-bounds-constant-array-index'
+]
+# DEFAULT_TIDY_ARGS = ['-checks=*']
+
+# The location which starts a clang-tidy diagnostic, e.g.
+# /path/to/hello.cc:15:1: warning: do not use namespace using-directives
+TIDY_DIAGNOSTIC_REGEX = re.compile(r'^(.+?):\d+:\d+: (?:warning|error): ')
+
+
+def tidy_args(tidy_options=None):
+    """Return the clang-tidy arguments for tidy_options, a string of
+    options written as they would be on a command line, or the default
+    arguments when there are none."""
+    if not tidy_options:
+        return list(DEFAULT_TIDY_ARGS)
+    return shlex.split(tidy_options)
+
+
+def tidy_command(files, tidy_options, skip_compile_cmd, db_dir):
+    """The clang-tidy command linting files, with the compile commands DB
+    in db_dir unless skip_compile_cmd is set."""
+    cmd = ['clang-tidy'] + tidy_args(tidy_options) + list(files)
+    if skip_compile_cmd:
+        cmd += ['--', '-std=c++17']
+    else:
+        cmd += ['-p', db_dir]
+    return cmd
+
+
+def store_lint_warnings(key, warnings, returncode):
+    """Cache a file's clang-tidy warnings under key unless clang-tidy
+    failed without reporting any."""
+    if returncode == 0 or warnings:
+        resultcache.store(key, warnings)
+
+
+def lint_cache_key(file, tidy_options, skip_compile_cmd, compilecmd):
+    """The result cache key for linting file. Warnings name the file so its
+    path is part of the key, and clang-tidy reads the headers it includes
+    so theirs are too."""
+    return resultcache.cache_key(
+        file,
+        'clang-tidy',
+        tidy_options,
+        os.path.realpath(file),
+        skip_compile_cmd,
+        compilecmd,
+        buildcache.sources_digest(buildcache.build_sources(file)),
     )
-    # print('\n'.join(list(diff)))
-    return list(diff)
 
 
+@timed
 def lint_check(file, tidy_options=None, skip_compile_cmd=False):
     """ Use clang-tidy to lint the file. Options for clang-tidy \
     defined in the function. """
     logger = setup_logger()
     # clang-tidy
+    compilecmd = None
     if not skip_compile_cmd:
         compilecmd = makefile_get_compilecmd(
             os.path.dirname(os.path.realpath(file))
         )
-    if not skip_compile_cmd and compilecmd:
-        logger.debug('Using compile command %s', compilecmd)
-        create_clang_compile_commands_db(
-            remove_existing_db=True, compile_cmd=compilecmd
-        )
-    elif not skip_compile_cmd and not compilecmd:
-        logger.debug('Creating compile commands.')
-        create_clang_compile_commands_db(files=[file], remove_existing_db=True)
-    cmd = 'clang-tidy'
+    key = lint_cache_key(file, tidy_options, skip_compile_cmd, compilecmd)
+    cached_warnings = resultcache.lookup(key)
+    if cached_warnings is not None:
+        return cached_warnings
     if not tidy_options:
         logger.debug('Using default tidy options.')
-        cmd_options = r'-checks="-*,google-*, modernize-*, \
-        readability-*,cppcoreguidelines-*,\
-        -google-build-using-namespace,\
-        -google-readability-todo,\
-        -modernize-use-trailing-return-type,\
-        -cppcoreguidelines-avoid-magic-numbers,\
-        -readability-magic-numbers,\
-        -cppcoreguidelines-pro-type-union-access,\
-        -cppcoreguidelines-pro-bounds-constant-array-index"'
-        # cmd_options = '-checks="*"'
-    else:
-        cmd_options = tidy_options
-    cmd = cmd + ' ' + cmd_options + ' ' + file
-    if skip_compile_cmd:
-        cmd = cmd + ' -- -std=c++17'
-    logger.debug('Tidy command %s', cmd)
-    proc = subprocess.run(
-        [cmd],
-        capture_output=True,
-        shell=True,
-        timeout=60,
-        check=False,
-        text=True,
-    )
-    linter_warnings = str(proc.stdout).split('\n')
+    with job_dir() as work_dir:
+        if not skip_compile_cmd:
+            if compilecmd:
+                logger.debug('Using compile command %s', compilecmd)
+            else:
+                logger.debug('Creating compile commands.')
+            write_compile_commands_db(
+                compile_commands_entries([os.path.realpath(file)], compilecmd),
+                out=os.path.join(work_dir, 'compile_commands.json'),
+            )
+        cmd = tidy_command([file], tidy_options, skip_compile_cmd, work_dir)
+        logger.debug('Tidy command %s', shlex.join(cmd))
+        proc = cmdexec.run(cmd, timeout=60)
+    linter_warnings = proc.stdout.split('\n')
     linter_warnings = [line for line in linter_warnings if line != '']
+    store_lint_warnings(key, linter_warnings, proc.returncode)
     return linter_warnings
 
 
-def pylint_check(file, epsilon=1.0):
-    """Use pylint to lint the input file."""
-    from pylint import epylint as lint
-
-    linting_passed = False
-    linter_warnings = []
-    if os.stat(file).st_size == 0:
-        logging.warning('File %s is empty.', file)
-    else:
-        (pylint_stdout, pylint_stderr) = lint.py_run(
-            file + ' -d no-member', return_std=True
+def _split_tidy_output(lines, files):
+    """Given clang-tidy's output for several files, return a dictionary of
+    file to the lines of the diagnostics reported in that file. Lines
+    which belong to a diagnostic (source excerpts, notes) stay with it."""
+    owners = {os.path.realpath(file): file for file in files}
+    warnings = {file: [] for file in files}
+    owner = files[0]
+    for line in lines:
+        match = TIDY_DIAGNOSTIC_REGEX.match(line)
+        if match:
+            # Diagnostics in headers stay with the file before them.
+            owner = owners.get(os.path.realpath(match.group(1)), owner)
+        warnings[owner].append(line)
+    return warnings
+
+
+@timed('clang-tidy')
+def _lint_chunk(files, tidy_options, skip_compile_cmd, db_dir):
+    """Run a single clang-tidy over all of files. Returns a dictionary of
+    file to warnings and clang-tidy's exit status."""
+    cmd = tidy_command(files, tidy_options, skip_compile_cmd, db_dir)
+    logging.debug('Tidy command %s', shlex.join(cmd))
+    proc = cmdexec.run(cmd, timeout=60 * len(files))
+    lines = [line for line in proc.stdout.split('\n') if line != '']
+    return (_split_tidy_output(lines, files), proc.returncode)
+
+
+def lint_check_many(
+    files,
+    tidy_options=None,
+    skip_compile_cmd=False,
+    max_workers=None,
+    db_dir=None,
+):
+    """Lint many files, possibly from many submissions, at once. One compile
+    commands DB covering every file is written to db_dir (a private
+    working directory by default; see workdir.job_dir()) and the files are
+    split across at most max_workers concurrent clang-tidy processes (one
+    per CPU by default), like run-clang-tidy -j. Returns an ordered
+    dictionary of file to the list of warnings lint_check would return."""
+    if db_dir is None:
+        with job_dir() as work_dir:
+            return lint_check_many(
+                files, tidy_options, skip_compile_cmd, max_workers, work_dir
+            )
+    logger = setup_logger()
+    files = list(files)
+    if not max_workers:
+        max_workers = default_workers()
+    compilecmds = {}
+    if not skip_compile_cmd:
+        compilecmds = prefetch_compilecmds(
+            [os.path.dirname(os.path.realpath(file)) for file in files],
+            max_workers,
         )
-        stdout = '\n'.join(pylint_stdout.readlines())
-        stderr = '\n'.join(pylint_stderr.readlines())
-        # print(s)
-        pattern = r"been rated at (-?\d?\d?\d?\d.\d\d)/10"
-        search_results = re.search(pattern, stdout)
-        if search_results:
-            match = search_results.group(1)
-            # print('\t{}: {}'.format(file, match))
-        else:
-            logging.error('%s: no match\n%s\n%s', file, stdout, stderr)
-            match = '-999'
-        pylint_best_score = 10.0
-        score = float(match)
-        if pylint_best_score - epsilon > score:
-            logging.error(
-                '%s does not pass linting. %.2f/%.2f',
-                file,
-                score,
-                pylint_best_score,
+    all_warnings = collections.OrderedDict((file, None) for file in files)
+    keys = {}
+    for file in files:
+        compilecmd = compilecmds.get(os.path.dirname(os.path.realpath(file)))
+        keys[file] = lint_cache_key(
+            file, tidy_options, skip_compile_cmd, compilecmd
+        )
+        all_warnings[file] = resultcache.lookup(keys[file])
+    todo = [file for file in files if all_warnings[file] is None]
+    if not todo:
+        return all_warnings
+    if not skip_compile_cmd:
+        compile_commands_db = []
+        for file in todo:
+            compilecmd = compilecmds[os.path.dirname(os.path.realpath(file))]
+            compile_commands_db += compile_commands_entries(
+                [os.path.realpath(file)], compilecmd
             )
-        else:
-            logging.info(
-                '%s passes linting. %.2f/%.2f', file, score, pylint_best_score
+        write_compile_commands_db(
+            compile_commands_db,
+            remove_existing_db=True,
+            out=os.path.join(db_dir, 'compile_commands.json'),
+        )
+    chunks = [todo[index::max_workers] for index in range(max_workers)]
+    chunks = [chunk for chunk in chunks if chunk]
+    logger.debug(
+        'Linting %d files with %d clang-tidy processes.', len(todo), len(chunks)
+    )
+    with concurrent.futures.ThreadPoolExecutor(len(chunks)) as executor:
+        for warnings, returncode in executor.map(
+            lambda chunk: _lint_chunk(
+                chunk, tidy_options, skip_compile_cmd, db_dir
+            ),
+            chunks,
+        ):
+            for file, linter_warnings in warnings.items():
+                all_warnings[file] = linter_warnings
+                store_lint_warnings(keys[file], linter_warnings, returncode)
+    return all_warnings
+
+
+# Arguments given to every pylint run. Files are linted together, so the
+# duplicate-code check, which compares files, is disabled to score each
+# file as if it were linted alone.
+PYLINT_ARGS = [
+    '-d',
+    'no-member',
+    '--disable=duplicate-code',
+    '--reports=n',
+    '--persistent=n',
+]
+
+PYLINT_BEST_SCORE = 10.0
+
+# The layout of a message in the warnings pylint_check() returns; the
+# same as epylint's.
+PYLINT_MSG_TEMPLATE = (
+    '{path}:{line}: {category} ({msg_id}, {symbol}, {obj}) {msg}'
+)
+
+PylintMessage = collections.namedtuple(
+    'PylintMessage',
+    ['path', 'line', 'column', 'category', 'msg_id', 'symbol', 'obj', 'msg'],
+)
+
+
+def _pylintrc(file):
+    """The .pylintrc nearest to file, searching up from its directory, or
+    None."""
+    directory = os.path.dirname(os.path.abspath(file))
+    while True:
+        rcfile = os.path.join(directory, '.pylintrc')
+        if os.path.isfile(rcfile):
+            return rcfile
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _pylint_score(linter, module_stats):
+    """The score pylint gives a module, from its by_module statistics and
+    the run's evaluation expression, which a .pylintrc may change. None
+    if pylint would not rate it: nothing was parsed, as when there is a
+    syntax error, or the expression failed."""
+    if not module_stats.get('statement'):
+        return None
+    names = ('fatal', 'error', 'warning', 'refactor', 'convention', 'info')
+    stats = {name: module_stats.get(name, 0) for name in names}
+    stats['statement'] = module_stats['statement']
+    try:
+        # pylint: disable-next=eval-used
+        return float(eval(linter.config.evaluation, {}, stats))
+    except Exception as exception:  # pylint: disable=broad-except
+        logging.error('pylint cannot rate the file: %s', exception)
+        return None
+
+
+def _run_pylint(files, rcfile, jobs):
+    """Lint files in this process with one pylint run of jobs processes.
+    Returns a dictionary of the absolute path of each file linted to its
+    score, None if it has none, and its list of PylintMessage."""
+    # pylint: disable=import-outside-toplevel
+    from pylint.lint import Run
+    from pylint.reporters import CollectingReporter
+
+    class Reporter(CollectingReporter):
+        """Collect the messages and remember the file of each module."""
+
+        def __init__(self):
+            super().__init__()
+            self.module_files = {}
+
+        def on_set_current_module(self, module, filepath):
+            self.module_files[module] = filepath
+            super().on_set_current_module(module, filepath)
+
+    args = list(PYLINT_ARGS) + ['-j', str(jobs)]
+    if rcfile:
+        args += ['--rcfile', rcfile]
+    reporter = Reporter()
+    linter = Run(args + list(files), reporter=reporter, exit=False).linter
+    stats = linter.stats
+    by_module = (
+        stats.by_module if hasattr(stats, 'by_module') else stats['by_module']
+    )
+    outcome = {}
+    for module, filepath in reporter.module_files.items():
+        if filepath:
+            score = _pylint_score(linter, by_module.get(module, {}))
+            outcome[os.path.abspath(filepath)] = (score, [])
+    for message in reporter.messages:
+        entry = outcome.setdefault(os.path.abspath(message.path), (None, []))
+        entry[1].append(
+            PylintMessage(
+                message.path,
+                message.line,
+                message.column,
+                message.category,
+                message.msg_id,
+                message.symbol,
+                message.obj,
+                message.msg,
             )
-            linting_passed = True
-        linter_warnings = stdout.split('\n')
-        linter_warnings = [
-            line for line in linter_warnings if line != '' and line != ' '
-        ]
-    return (linting_passed, linter_warnings)
+        )
+    return outcome
+
+
+@timed('pylint')
+def pylint_check_many(files, epsilon=1.0, jobs=None):
+    """Use pylint, in this process, to lint every file in one pass per
+    .pylintrc, with jobs parallel processes (default_workers() if None).
+    Returns an ordered dictionary of file to (passed, score, messages),
+    where messages is a list of PylintMessage. Files pylint does not
+    rate, such as empty files, do not pass and have no score."""
+    jobs = jobs or default_workers()
+    outcomes = collections.OrderedDict()
+    groups = collections.OrderedDict()
+    for file in files:
+        outcomes[file] = (False, None, [])
+        if os.stat(file).st_size == 0:
+            logging.warning('File %s is empty.', file)
+        else:
+            groups.setdefault(_pylintrc(file), []).append(file)
+    for rcfile, group in groups.items():
+        linted = _run_pylint(group, rcfile, min(jobs, len(group)))
+        for file in group:
+            if os.path.abspath(file) not in linted:
+                logging.error('%s: pylint did not lint the file', file)
+                continue
+            score, messages = linted[os.path.abspath(file)]
+            if score is None:
+                logging.error('%s: pylint gave no score', file)
+                outcomes[file] = (False, None, messages)
+                continue
+            passed = PYLINT_BEST_SCORE - epsilon <= score
+            if passed:
+                logging.info(
+                    '%s passes linting. %.2f/%.2f',
+                    file,
+                    score,
+                    PYLINT_BEST_SCORE,
+                )
+            else:
+                logging.error(
+                    '%s does not pass linting. %.2f/%.2f',
+                    file,
+                    score,
+                    PYLINT_BEST_SCORE,
+                )
+            outcomes[file] = (passed, score, messages)
+    return outcomes
+
+
+def pylint_messages_text(messages):
+    """Format PylintMessage as pylint's text output does."""
+    return [
+        PYLINT_MSG_TEMPLATE.format(**message._asdict()) for message in messages
+    ]
+
+
+def pylint_check(file, epsilon=1.0):
+    """Use pylint to lint the input file. Returns whether it passes and
+    its messages as text. See pylint_check_many()."""
+    passed, _, messages = pylint_check_many([file], epsilon)[file]
+    return (passed, pylint_messages_text(messages))
+
+
+def _import_black():
+    """Import black on first use so the C++ checks do not pay for it.
+    black's parser logs its grammar table caching at INFO, which students
+    never saw while black was imported before the logger was set up, so
+    it is kept to warnings."""
+    logging.getLogger('blib2to3').setLevel(logging.WARNING)
+    # pylint: disable-next=import-outside-toplevel
+    import black
+
+    return black
 
 
 def pyformat_file_in_place(
-    src: black.Path,
+    src: 'black.Path',
     fast: bool,
-    mode: black.Mode,
-    write_back: black.WriteBack = black.WriteBack.NO,
-    lock: black.Any = None,  # multiprocessing.Manager().Lock() is some crazy proxy
+    mode: 'black.Mode',
+    write_back: 'black.WriteBack' = None,
+    lock: 'black.Any' = None,  # multiprocessing.Manager().Lock() is some crazy proxy
 ) -> (bool, str):
     """This was taken from black so that the diff is captured to a string rather than sent directly to stdout. Format file under `src` path. Return True if changed.
     If `write_back` is DIFF, write a diff to stdout. If it is YES, write reformatted
     code to the file.
     `mode` and `fast` options are passed to :func:`format_file_contents`.
     """
+    black = _import_black()
+
+    if write_back is None:
+        write_back = black.WriteBack.NO
     then = datetime.utcfromtimestamp(src.stat().st_mtime)
     with open(src, "rb") as buf:
         src_contents, encoding, newline = black.decode_bytes(buf.read())
@@ -371,129 +892,99 @@ def pyformat_file_in_place(
     return (True, diff_contents)
 
 
-def pyformat_check(file):
-    """Use black to check the style of the input file."""
-    diff_contents = None
-    # black.freeze_support()
-    # black.patch_click()
-    # black.main()
-    check = True
-    diff = True
-    color = False
-    verbose = False
-    line_length = 80
-    fast = False
-    write_back = False
-    quiet = True
-    write_back = black.WriteBack.from_configuration(
-        check=check, diff=diff, color=color
-    )
-    versions = set()
-    mode = black.Mode(
-        target_versions=versions,
-        line_length=line_length,
+def _pyformat_mode():
+    """The black mode the Python files are checked against."""
+    black = _import_black()
+
+    return black.Mode(
+        target_versions=set(),
+        line_length=80,
         is_pyi=False,
         is_ipynb=False,
         string_normalization=False,
         magic_trailing_comma=False,
         experimental_string_processing=False,
     )
-    report = black.Report(check=check, diff=diff, quiet=quiet, verbose=verbose)
-    sources = [black.Path(file)]
-    # You can process multiple files very fast, a single file is all we need.
-    if len(sources) == 1:
-        # black.reformat_one(
-        #    src=sources.pop(),
-        #    fast=fast,
-        #    write_back=write_back,
-        #    mode=mode,
-        #    report=report,
-        # )
-        src = sources.pop()
-        try:
-            changed = black.Changed.NO
-            cache: Cache = {}
-            if write_back not in (
-                black.WriteBack.DIFF,
-                black.WriteBack.COLOR_DIFF,
-            ):
-                cache = black.read_cache(mode)
-                res_src = src.resolve()
-                res_src_s = str(res_src)
-                if res_src_s in cache and cache[
-                    res_src_s
-                ] == black.get_cache_info(res_src):
-                    changed = black.Changed.CACHED
-            if changed is not black.Changed.CACHED:
-                (status, diff_contents) = pyformat_file_in_place(
-                    src, fast=fast, write_back=write_back, mode=mode
-                )
-                if status:
-                    changed = black.Changed.YES
-            if (
-                write_back is black.WriteBack.YES
-                and changed is not black.Changed.CACHED
-            ) or (
-                write_back is black.WriteBack.CHECK
-                and changed is black.Changed.NO
-            ):
-                black.write_cache(cache, [src], mode)
-            report.done(src, changed)
-        except Exception as exc:
-            if report.verbose:
-                black.traceback.print_exc()
-            report.failed(src, str(exc))
 
-    else:
-        workers = 2
-        black.reformat_many(
-            sources=sources,
-            fast=fast,
-            write_back=write_back,
+
+def _pyformat_diff(file, mode):
+    """Check the format of one file. Returns the lines of the diff black
+    would apply, empty if there are none, or None if black failed."""
+    black = _import_black()
+
+    try:
+        changed, diff_contents = pyformat_file_in_place(
+            black.Path(file),
+            fast=False,
             mode=mode,
-            report=report,
-            workers=workers,
+            write_back=black.WriteBack.DIFF,
         )
+    except Exception as exc:  # pylint: disable=broad-except
+        logging.error('%s: black failed: %s', file, exc)
+        return None
+    return diff_contents.split('\n') if changed else []
+
+
+@timed('pyformat')
+def pyformat_check_many(files, workers=None):
+    """Use black to check the style of every file, on a process pool of
+    workers processes (default_workers() if None). Returns an ordered
+    dictionary of file to the lines of its diff, empty if the file is
+    formatted, or None if black could not check it. Files the format
+    cache records as formatted are not checked again, and the files found
+    formatted are written to it in one transaction (see formatcache)."""
+    mode = _pyformat_mode()
+    diffs = collections.OrderedDict((file, None) for file in files)
+    with formatcache.FormatCache(formatcache.mode_key(mode)) as cache:
+        unchecked = []
+        for file in files:
+            if cache.is_formatted(file):
+                diffs[file] = []
+            else:
+                unchecked.append(file)
+        workers = min(workers or default_workers(), len(unchecked))
+        if workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                checked = executor.map(
+                    _pyformat_diff, unchecked, [mode] * len(unchecked)
+                )
+                diffs.update(zip(unchecked, checked))
+        else:
+            diffs.update(
+                (file, _pyformat_diff(file, mode)) for file in unchecked
+            )
+        cache.record(file for file in unchecked if diffs[file] == [])
+    return diffs
 
-    # print(diff_contents)
-    # print(report.__dict__)
-    # Pycodestyle
-    # see https://pycodestyle.pycqa.org/en/latest/advanced.html
-    # class TestCodeFormat(unittest.TestCase):
-    #
-    #    def test_conformance(self):
-    #        """Test that we conform to PEP-8."""
-    #        style = pycodestyle.StyleGuide(quiet=True)
-    #        result = style.check_files(['file1.py', 'file2.py'])
-    #        self.assertEqual(result.total_errors, 0,
-    #                         "Found code style errors (and warnings).")
-    # or
-    # fchecker = pycodestyle.Checker('testsuite/E27.py', show_source=True)
-    # file_errors = fchecker.check_all()
-    if diff_contents:
-        diff_contents = diff_contents.split('\n')
-    return diff_contents
+
+def pyformat_check(file):
+    """Use black to check the style of the input file. See
+    pyformat_check_many()."""
+    return pyformat_check_many([file])[file]
 
 
 def glob_py_src_files(target_dir='.'):
     """Recurse through the target_dir and find all the .py files."""
-    return glob.glob(os.path.join(target_dir, '**/*.py'), recursive=True)
+    return [path for _, path in walk_sources(target_dir, kinds=('py',))]
 
 
 def glob_cc_src_files(target_dir='.'):
     """Recurse through the target_dir and find all the .cc files."""
-    return glob.glob(os.path.join(target_dir, '**/*.cc'), recursive=True)
+    return [path for _, path in walk_sources(target_dir, kinds=('cc',))]
 
 
 def glob_h_src_files(target_dir='.'):
     """Recurse through the target_dir and find all the .h files."""
-    return glob.glob(os.path.join(target_dir, '**/*.h'), recursive=True)
+    return [path for _, path in walk_sources(target_dir, kinds=('h',))]
 
 
 def glob_all_src_files(target_dir='.'):
-    """Recurse through the target_dir and find all the .cc and .h files."""
-    files = glob_cc_src_files(target_dir) + glob_h_src_files(target_dir)
-    return files
+    """Recurse through the target_dir and find all the .cc and .h files,
+    the .cc files first, in a single walk."""
+    found = {'cc': [], 'h': []}
+    for kind, path in walk_sources(target_dir, kinds=('cc', 'h')):
+        found[kind].append(path)
+    return found['cc'] + found['h']
 
 
 def make_spotless(target_dir):
@@ -504,17 +995,34 @@ def make_spotless(target_dir):
     return status
 
 
-def make_build(target_dir, always_clean=True):
+def make_build(target_dir, always_clean=True, skip_clean_if_unchanged=False):
     """Given a directory that contains a GNU Makefile, build with `make all`.
-    This function call will call `make spotless` via make_spotless()"""
+    This function call will call `make spotless` via make_spotless(). With
+    skip_clean_if_unchanged, the clean is skipped when the sources and
+    Makefile are the same as at the last successful build so make can
+    reuse the object files and binary it left behind."""
     status = True
-    if always_clean:
+    digest = None
+    if skip_clean_if_unchanged:
+        digest = buildcache.make_inputs_digest(
+            target_dir, glob_all_src_files(target_dir)
+        )
+    if (
+        always_clean
+        and digest
+        and buildcache.make_inputs_unchanged(target_dir, digest)
+    ):
+        logging.debug('Inputs unchanged; skipping make spotless.')
+    elif always_clean:
         status = make_spotless(target_dir)
     if status:
         status = make(target_dir, 'all')
+    if status and digest:
+        buildcache.record_make_inputs(target_dir, digest)
     return status
 
 
+@timed
 def make(target_dir, make_target):
     """Given a directory, execute make_target given the GNU Makefile in the
     directory."""
@@ -523,52 +1031,81 @@ def make(target_dir, make_target):
         logging.error('Makefile does not exist in %s', target_dir)
         status = False
     else:
-        cmd = 'make -C {} {}'.format(target_dir, make_target)
-        logging.debug(cmd)
-        proc = subprocess.run(
-            [cmd],
-            capture_output=True,
-            shell=True,
-            timeout=15,
-            check=False,
-            text=True,
-        )
+        cmd = ['make', '-C', target_dir, make_target]
+        logging.debug(shlex.join(cmd))
+        proc = cmdexec.run(cmd, timeout=15)
         # if proc.stdout:
         #    logging.info('stdout: %s', str(proc.stdout).rstrip("\n\r"))
         if proc.stderr:
-            logging.info('stderr: %s', str(proc.stderr).rstrip("\n\r"))
+            logging.info('stderr: %s', proc.stderr.rstrip("\n\r"))
         if proc.returncode != 0:
             status = False
     return status
 
 
-def build(file, target='asgt', compiletimeout=10):
+BUILD_COMPILER = 'clang++'
+BUILD_FLAGS = ['-Wall', '-pedantic', '-std=c++14']
+
+
+def build_cache_key(file):
+    """The build cache key for compiling file with BUILD_FLAGS."""
+    return buildcache.build_key(file, BUILD_COMPILER, ' '.join(BUILD_FLAGS))
+
+
+def build_command(file, target):
+    """The command compiling file into target."""
+    return [BUILD_COMPILER] + BUILD_FLAGS + ['-o', target, file]
+
+
+@timed
+def build(file, target='asgt', compiletimeout=10, use_cache=True):
     """Given a C++ source file, build with clang C++14 with -Wall
-    and -pedantic. Output is 'asgt'. Binary is left on the file system."""
+    and -pedantic. Output is 'asgt'. Binary is left on the file system.
+    Unless use_cache is False, a binary previously built from the same
+    sources with the same compiler and flags is reused."""
     logger = setup_logger()
     # rm the file if exists
     if os.path.exists(target):
         os.unlink(target)
     status = True
-    cmd = 'clang++ -Wall -pedantic -std=c++14 -o {} {}'.format(target, file)
-    logger.debug(cmd)
-    proc = subprocess.run(
-        [cmd],
-        capture_output=True,
-        shell=True,
-        timeout=compiletimeout,
-        check=False,
-        text=True,
-    )
+    key = None
+    if use_cache:
+        key = build_cache_key(file)
+        messages = buildcache.fetch(key, file, target)
+        if messages is not None:
+            logger.debug('Reusing cached build of %s', file)
+            (stdout, stderr) = messages
+            if stdout:
+                logger.info('stdout: %s', stdout.rstrip("\n\r"))
+            if stderr:
+                logger.info('stderr: %s', stderr.rstrip("\n\r"))
+            return status
+    cmd = build_command(file, target)
+    logger.debug(shlex.join(cmd))
+    proc = cmdexec.run(cmd, timeout=compiletimeout)
     if proc.stdout:
-        logger.info('stdout: %s', str(proc.stdout).rstrip("\n\r"))
+        logger.info('stdout: %s', proc.stdout.rstrip("\n\r"))
     if proc.stderr:
-        logger.info('stderr: %s', str(proc.stderr).rstrip("\n\r"))
+        logger.info('stderr: %s', proc.stderr.rstrip("\n\r"))
     if proc.returncode != 0:
         status = False
+    elif key:
+        buildcache.store(key, file, target, proc.stdout, proc.stderr)
     return status
 
 
+def check_headers_timed(files):
+    """check_headers() for each of files, timed. Returns the headers and
+    a dictionary of file to the seconds its header took."""
+    headers = collections.OrderedDict()
+    durations = {}
+    for file in files:
+        start = time.perf_counter()
+        headers.update(check_headers([file]))
+        durations[file] = time.perf_counter() - start
+    return headers, durations
+
+
 def identify(header):
     """String to identify submission's owner."""
     ident = '(Malformed Header)'
@@ -599,10 +1136,18 @@ def has_main_function(file):
     return status
 
 
-def solution_check_simple(run=None, files=None, do_format_check=True, do_lint_check=True, tidy_options=None, skip_compile_cmd=False):
+def _timed_run(run, binary):
+    """Call a solution checker's run function as the 'run' stage."""
+    with span('run'):
+        return run(binary)
+
+
+def solution_check_simple(run=None, files=None, do_format_check=True, do_lint_check=True, tidy_options=None, skip_compile_cmd=False, max_workers=None):
     """Main function for checking student's solution. Provide a pointer to a
-    run function."""
+    run function. The format, lint, and build checks run on a pool of at
+    most max_workers processes (one per CPU by default)."""
     logger = setup_logger()
+    run_start = time.perf_counter()
     if len(sys.argv) < 3:
         logger.error(
             'provide target directory, program name, and optionally a base directory to run a diff'
@@ -621,18 +1166,35 @@ def solution_check_simple(run=None, files=None, do_format_check=True, do_lint_ch
         logger.error("❌ No files in %s.", target_directory)
         sys.exit(1)
 
+    # Check if files have changed
+    if base_directory:
+        if not files_changed_from_base(files, base_directory):
+            sys.exit(1)
+    else:
+        logger.debug('Skipping base file comparison.')
+
     # Header checks
-    files_missing_header = [file for file in files if not header_check(file)]
-    files_with_header = [file for file in files if header_check(file)]
+    headers, header_durations = check_headers_timed(files)
+    for file in files:
+        results.emit(
+            'header',
+            headers[file][0],
+            file,
+            header_durations[file],
+            header=headers[file][1],
+        )
+    files_missing_header = [file for file in files if not headers[file][0]]
+    files_with_header = [file for file in files if headers[file][0]]
     header = None
     if len(files_with_header) == 0:
         logger.error('❌ No header provided in any file in %s. Exiting.', target_directory)
         logger.error('All files: %s', ' '.join(files))
+        results.emit(
+            'solution', 'fail', duration=time.perf_counter() - run_start
+        )
         sys.exit(1)
     else:
-        with open(files_with_header[0]) as file_handle:
-            contents = file_handle.read()
-        header = dict_header(contents)
+        header = headers[files_with_header[0]][1]
     
     logger.info('Start %s', identify(header))
     logger.info('All files: %s', ' '.join(files))
@@ -641,25 +1203,101 @@ def solution_check_simple(run=None, files=None, do_format_check=True, do_lint_ch
             'Files missing headers: %s', ' '.join(files_missing_header)
         )
 
-    # Check if files have changed
-    if base_directory:
-        count = 0
-        for file in files:
-            diff = compare_files(file, os.path.join(base_directory, file))
-            if len(diff) == 0:
-                count += 1
-                logger.error('No changes made to the file %s.', file)
-        if count == len(files):
-            logger.error('No changes made to any files.')
-            sys.exit(1)
-    else:
-        logger.debug('Skipping base file comparison.')
+    # Format, lint, and build do not depend on one another; run them
+    # concurrently and report the results in the usual order.
+    main_src_files = [file for file in files if has_main_function(file)]
+    main_src_file = main_src_files[0] if main_src_files else None
+    jobs = []
+    if do_format_check:
+        jobs += [
+            Job('format:' + file, format_is_clean, (file,)) for file in files
+        ]
+    if do_lint_check:
+        # Each lint writes its compile commands DB to its own directory.
+        jobs += [
+            Job(
+                'lint:' + file,
+                lint_check,
+                (file, tidy_options, skip_compile_cmd),
+            )
+            for file in files
+        ]
+    # The binary is built in a private working directory and removed
+    # when the check is done.
+    with job_dir() as work_dir:
+        binary = os.path.join(work_dir, sys.argv[2])
+        if main_src_file:
+            jobs.append(Job('build', build, (main_src_file, binary)))
+        job_results = run_jobs(jobs, max_workers)
+
+        def outcome(name):
+            return replay(job_results[name]), job_results[name].duration
+
+        status = report_solution(
+            files,
+            main_src_files,
+            target_directory,
+            outcome,
+            run,
+            do_format_check,
+            do_lint_check,
+            binary,
+        )
+    logger.info('End %s', identify(header))
+    results.emit(
+        'solution',
+        status == 0,
+        duration=time.perf_counter() - run_start,
+        student=header,
+    )
+    sys.exit(status)
+
 
+# The outcome of a check cancelled after a fatal failure elsewhere.
+CANCELLED = object()
+
+
+def report_solution(
+    files,
+    main_src_files,
+    target_directory,
+    outcome,
+    run=None,
+    do_format_check=True,
+    do_lint_check=True,
+    binary=None,
+):
+    """Log and record the format, lint, build, and run results of a
+    solution check and return the exit status. outcome(name) returns the
+    value and duration of the check called name ('format:' or 'lint:'
+    followed by the file, or 'build'); the value is CANCELLED if the
+    check was cancelled. The built binary, passed to run, is './' and the
+    program named on the command line unless given. Used by
+    solution_check_simple() and solution_check_async()."""
+    logger = setup_logger()
+    main_src_file = main_src_files[0] if main_src_files else None
+    if not binary:
+        binary = './' + sys.argv[2]
     # Format
     if do_format_check:
         for file in files:
-            diff = format_check(file)
-            if len(diff) != 0:
+            clean, duration = outcome('format:' + file)
+            if clean is CANCELLED:
+                logger.info('Formatting check of %s was cancelled.', file)
+                results.emit('format', 'skipped', file, reason='cancelled')
+                continue
+            # The diff is cached when clang-format succeeds.
+            diff = [] if clean else list(format_diff(file))
+            results.emit(
+                'format',
+                'error' if clean is None else clean,
+                file,
+                duration,
+                diff_lines=len(diff),
+            )
+            if clean is None:
+                logger.warning('❌ Could not check formatting in %s.', file)
+            elif not clean:
                 logger.warning('❌ Formatting needs improvement in %s.', file)
                 logger.info(
                     'Please make sure your code conforms to the Google C++ style.'
@@ -671,14 +1309,26 @@ def solution_check_simple(run=None, files=None, do_format_check=True, do_lint_ch
     # Lint
     if do_lint_check:
         for file in files:
-            lint_warnings = lint_check(file, tidy_options, skip_compile_cmd)
-            if len(lint_warnings) != 0:
+            lint_warnings, duration = outcome('lint:' + file)
+            if lint_warnings is CANCELLED:
+                logger.info('Linting of %s was cancelled.', file)
+                results.emit('lint', 'skipped', file, reason='cancelled')
+                continue
+            results.emit(
+                'lint',
+                'error' if lint_warnings is None else len(lint_warnings) == 0,
+                file,
+                duration,
+                warnings=lint_warnings,
+            )
+            if lint_warnings is None:
+                logger.warning('❌ Could not lint %s.', file)
+            elif len(lint_warnings) != 0:
                 logger.warning('❌ Linter found improvements in %s.', file)
                 logger.debug('\n'.join(lint_warnings))
             else:
                 logger.info('✅ Linting passed in %s', file)
 
-
     status = 0
     # check to see if all the files end with .cc, if not, then we have to
     # find the file with the main function.
@@ -691,34 +1341,41 @@ def solution_check_simple(run=None, files=None, do_format_check=True, do_lint_ch
         logger.info(
             'Found more than one C++ source file: %s', ' '.join(cc_files)
         )
-    main_src_file = None
-    for file in files:
-        if has_main_function(file):
-            if not main_src_file:
-                main_src_file = file
-                logger.info('Main function found in %s', file)
-            else:
-                logger.warning('Extra main function found in %s', file)
     if main_src_file:
+        logger.info('Main function found in %s', main_src_file)
+        for file in main_src_files[1:]:
+            logger.warning('Extra main function found in %s', file)
         logger.info('Checking build for %s', main_src_file)
-        if build(main_src_file):
+        built, duration = outcome('build')
+        results.emit('build', bool(built), main_src_file, duration)
+        if built:
             logger.info('✅ Build passed')
             # Run
+            start = time.perf_counter()
             if not run:
                 logger.info('No run function specified...skipping.')
-            elif run and run('./' + sys.argv[2]):
+                results.emit('run', 'skipped')
+            elif run and _timed_run(run, binary):
                 logger.info('✅ Run passed')
+                results.emit(
+                    'run', 'pass', duration=time.perf_counter() - start
+                )
             else:
                 logger.error('❌ Run failed')
+                results.emit(
+                    'run', 'fail', duration=time.perf_counter() - start
+                )
                 status = 1
         else:
             logger.error('❌ Build failed')
             status = 1
     else:
-        logger.error('❌ No main function found in files: %s', ' '.join(cc_files))
+        logger.error(
+            '❌ No main function found in files: %s', ' '.join(cc_files)
+        )
+        results.emit('build', 'fail', reason='no main function')
         status = 1
-    logger.info('End %s', identify(header))
-    sys.exit(status)
+    return status
 
 
 def solution_check_make(run=None):
@@ -738,35 +1395,27 @@ def solution_check_make(run=None):
     files = glob_all_src_files(target_directory)
     if len(files) == 0:
         logger.error("No files in %s.", target_directory)
-    with open(files[0]) as file_handle:
-        contents = file_handle.read()
-    header = dict_header(contents)
-    logger.info('Start %s', identify(header))
-    logger.info('All files: %s', ' '.join(files))
-    files_missing_header = [file for file in files if not header_check(file)]
-    if len(files_missing_header) != 0:
-        logger.warning(
-            'Files missing headers: %s', ' '.join(files_missing_header)
-        )
 
     # Check if files have changed
     if base_directory:
-        count = 0
-        for file in files:
-            diff = compare_files(file, os.path.join(base_directory, file))
-            if len(diff) == 0:
-                count += 1
-                logger.error('No changes made in file %s.', file)
-        if count == len(files):
-            logger.error('No changes made ANY file. Stopping.')
+        if not files_changed_from_base(files, base_directory):
             sys.exit(1)
     else:
         logger.debug('Skipping base file comparison.')
 
+    headers = check_headers(files)
+    header = headers[files[0]][1]
+    logger.info('Start %s', identify(header))
+    logger.info('All files: %s', ' '.join(files))
+    files_missing_header = [file for file in files if not headers[file][0]]
+    if len(files_missing_header) != 0:
+        logger.warning(
+            'Files missing headers: %s', ' '.join(files_missing_header)
+        )
+
     # Format
     for file in files:
-        diff = format_check(file)
-        if len(diff) != 0:
+        if not format_is_clean(file):
             logger.warning("Formatting needs improvement in %s.", file)
             # logging.warning('\n'.join(diff))
         else:
@@ -786,7 +1435,7 @@ def solution_check_make(run=None):
     if make_build(target_directory):
         logger.info('Build passed')
         # Run
-        if run(os.path.join(target_directory, sys.argv[2])):
+        if _timed_run(run, os.path.join(target_directory, sys.argv[2])):
             logger.info('Run passed')
         else:
             logger.error('Run failed')
@@ -0,0 +1,130 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Run a program against a table of test vectors. Each vector gives the
+    command line arguments, the lines typed at the program, a regular
+    expression its output must match, and the exit status it must return.
+    Vectors run concurrently, each in its own pseudo terminal, on a
+    bounded pool of workers; results are reported in the order given. """
+# pexpect documentation
+#  https://pexpect.readthedocs.io/en/stable/index.html
+
+import collections
+import concurrent.futures
+import logging
+import time
+import pexpect
+from jobgraph import default_workers
+from timing import timed
+
+TestVector = collections.namedtuple(
+    'TestVector',
+    ['name', 'expected', 'args', 'input', 'exit_code', 'timeout'],
+    defaults=((), (), 0, 1),
+)
+TestVector.__doc__ = """One test: run the binary with args, send each line of
+input, expect the regular expression expected within timeout seconds, then
+expect the program to exit with exit_code."""
+
+TestResult = collections.namedtuple(
+    'TestResult', ['vector', 'passed', 'duration', 'messages']
+)
+
+
+@timed
+def run_test_vector(binary, vector):
+    """Run binary against one test vector and return a TestResult. Log
+    messages are returned in the result rather than logged so concurrent
+    tests do not interleave their output."""
+    messages = []
+    passed = False
+    start = time.perf_counter()
+    try:
+        proc = pexpect.spawn(
+            binary,
+            args=[str(arg) for arg in vector.args],
+            timeout=vector.timeout,
+        )
+    except pexpect.exceptions.ExceptionPexpect as exception:
+        messages.append((logging.ERROR, 'Could not run {}.'.format(binary)))
+        messages.append((logging.DEBUG, str(exception)))
+        return TestResult(vector, passed, time.perf_counter() - start, messages)
+    try:
+        for line in vector.input:
+            proc.sendline(str(line))
+        proc.expect(vector.expected)
+        proc.expect(pexpect.EOF)
+        proc.close()
+        if proc.exitstatus == vector.exit_code:
+            passed = True
+        else:
+            messages.append(
+                (
+                    logging.ERROR,
+                    'Exit status {} expected {}.'.format(
+                        proc.exitstatus, vector.exit_code
+                    ),
+                )
+            )
+    except (pexpect.exceptions.TIMEOUT, pexpect.exceptions.EOF) as exception:
+        messages.append((logging.ERROR, 'Could not find expected output.'))
+        messages.append((logging.DEBUG, str(exception)))
+        messages.append((logging.DEBUG, str(proc)))
+    finally:
+        if proc.isalive():
+            proc.close(force=True)
+    return TestResult(vector, passed, time.perf_counter() - start, messages)
+
+
+def run_test_vectors(binary, vectors, max_workers=None):
+    """Run binary against every test vector on a pool of at most
+    max_workers workers (default_workers() if None). Logs each test's
+    outcome and duration in order and returns True if every test passed."""
+    vectors = list(vectors)
+    if not vectors:
+        return True
+    if not max_workers:
+        max_workers = default_workers()
+    status = True
+    with concurrent.futures.ThreadPoolExecutor(
+        min(max_workers, len(vectors))
+    ) as executor:
+        results = executor.map(
+            lambda vector: run_test_vector(binary, vector), vectors
+        )
+        for index, result in enumerate(results):
+            logging.info('Test %d - %s', index + 1, result.vector.name)
+            for level, message in result.messages:
+                logging.log(level, '%s', message)
+            logging.info(
+                'Test %d %s in %.3f s',
+                index + 1,
+                'passed' if result.passed else 'failed',
+                result.duration,
+            )
+            status = status and result.passed
+    if not status:
+        logging.error('Did not receive expected response.')
+    return status
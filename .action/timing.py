@@ -0,0 +1,200 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Lightweight timing for the checkers. Wrap a stage in span() or
+    decorate a function with @timed and, when $GRADER_TIMING is set, a
+    table of where the time went is logged when the run ends.
+
+    $GRADER_TRACE names a file to receive the spans in the Chrome trace
+    event format (load it in chrome://tracing or Perfetto) and
+    $GRADER_PROFILE names a file to receive cProfile statistics for the
+    whole run (read it with python3 -m pstats). Spans recorded in job
+    graph workers are shipped back to the parent with the job's result.
+
+    ex.
+    GRADER_TIMING=1 python3 part-1/check_formatting
+"""
+
+import atexit
+import collections
+import contextlib
+import functools
+import json
+import logging
+import os
+import time
+
+TIMING_ENV = 'GRADER_TIMING'
+TRACE_ENV = 'GRADER_TRACE'
+PROFILE_ENV = 'GRADER_PROFILE'
+
+Span = collections.namedtuple('Span', ['name', 'start', 'duration', 'pid'])
+
+_spans = []
+_profiler = None
+
+
+def enabled():
+    """True if spans are being recorded."""
+    return bool(os.environ.get(TIMING_ENV) or os.environ.get(TRACE_ENV))
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the body of a with statement as the stage name."""
+    if not enabled():
+        yield
+        return
+    start = time.time()
+    counter = time.perf_counter()
+    try:
+        yield
+    finally:
+        _spans.append(
+            Span(name, start, time.perf_counter() - counter, os.getpid())
+        )
+
+
+def timed(name=None):
+    """Decorator timing every call of a function. Use it bare, @timed, to
+    name the span after the function or as @timed('name')."""
+
+    def decorator(func):
+        span_name = name if isinstance(name, str) else func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    if callable(name):
+        return decorator(name)
+    return decorator
+
+
+def mark():
+    """A bookmark for spans_since()."""
+    return len(_spans)
+
+
+def spans_since(bookmark=0):
+    """The spans recorded after bookmark was taken."""
+    return _spans[bookmark:]
+
+
+def merge(spans):
+    """Add spans recorded in another process."""
+    _spans.extend(spans)
+
+
+def reset():
+    """Forget every recorded span."""
+    del _spans[:]
+
+
+def summary_table(spans=None):
+    """Return the lines of a table with one row per stage giving the
+    number of calls and the total, mean and longest time, sorted by total
+    time."""
+    if spans is None:
+        spans = _spans
+    stages = collections.OrderedDict()
+    for item in spans:
+        stages.setdefault(item.name, []).append(item.duration)
+    rows = sorted(stages.items(), key=lambda row: sum(row[1]), reverse=True)
+    width = max([len('Stage')] + [len(stage) for stage in stages])
+    lines = [
+        '{:<{width}} {:>6} {:>9} {:>9} {:>9}'.format(
+            'Stage', 'Calls', 'Total s', 'Mean s', 'Max s', width=width
+        )
+    ]
+    for stage, durations in rows:
+        lines.append(
+            '{:<{width}} {:>6} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                stage,
+                len(durations),
+                sum(durations),
+                sum(durations) / len(durations),
+                max(durations),
+                width=width,
+            )
+        )
+    return lines
+
+
+def write_trace(path, spans=None):
+    """Write spans to path in the Chrome trace event format."""
+    if spans is None:
+        spans = _spans
+    events = [
+        {
+            'name': item.name,
+            'ph': 'X',
+            'ts': int(item.start * 1e6),
+            'dur': int(item.duration * 1e6),
+            'pid': item.pid,
+            'tid': item.pid,
+        }
+        for item in spans
+    ]
+    with open(path, 'w') as file_handle:
+        json.dump({'traceEvents': events}, file_handle)
+
+
+def start_profile():
+    """Start profiling the process if $GRADER_PROFILE is set."""
+    global _profiler  # pylint: disable=global-statement
+    if _profiler is not None or not os.environ.get(PROFILE_ENV):
+        return
+    import cProfile  # pylint: disable=import-outside-toplevel
+
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+
+def report(logger=None):
+    """Finish the run: log the summary table, write the trace and the
+    profile as requested by the environment. Safe to call more than once;
+    later calls only report spans recorded since."""
+    global _profiler  # pylint: disable=global-statement
+    if not logger:
+        logger = logging.getLogger()
+    if os.environ.get(TIMING_ENV) and _spans:
+        logger.info('Timing summary')
+        for line in summary_table():
+            logger.info(line)
+    if os.environ.get(TRACE_ENV) and _spans:
+        write_trace(os.environ[TRACE_ENV])
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(os.environ[PROFILE_ENV])
+        _profiler = None
+    reset()
+
+
+start_profile()
+atexit.register(report)
@@ -0,0 +1,77 @@
+#
+# Copyright 2022 Michael Shafae
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+""" Private working directories for the files a check produces: the
+    binaries it builds and the compile commands DB clang-tidy reads. Each
+    check gets its own directory, removed when the check is done, so checks
+    running side by side on one machine never overwrite each other's files.
+
+    The directories are made in $GRADER_TMPDIR when it is set, otherwise in
+    /dev/shm when it is available so the files never reach a disk, and
+    otherwise in the system's temporary directory. /dev/shm is passed over
+    when it is mounted noexec, as it is in Docker and on many hardened
+    hosts, since the binaries built there must be run. """
+
+import contextlib
+import os
+import os.path
+import tempfile
+
+TMPDIR_ENV = 'GRADER_TMPDIR'
+
+# A memory backed file system found on most Linux systems.
+SHM_DIR = '/dev/shm'
+
+
+def _allows_exec(path):
+    """False if path is on a file system mounted noexec."""
+    try:
+        flags = os.statvfs(path).f_flag
+    except (OSError, AttributeError):
+        return False
+    return not flags & getattr(os, 'ST_NOEXEC', 0)
+
+
+def base_dir():
+    """The directory the working directories are made in, or None for the
+    system's temporary directory."""
+    tmpdir = os.environ.get(TMPDIR_ENV)
+    if tmpdir:
+        return tmpdir
+    if (
+        os.path.isdir(SHM_DIR)
+        and os.access(SHM_DIR, os.W_OK | os.X_OK)
+        and _allows_exec(SHM_DIR)
+    ):
+        return SHM_DIR
+    return None
+
+
+@contextlib.contextmanager
+def job_dir(prefix='grade-'):
+    """Make a private working directory, yield its path, and remove it and
+    everything in it afterwards."""
+    with tempfile.TemporaryDirectory(prefix=prefix, dir=base_dir()) as path:
+        yield path